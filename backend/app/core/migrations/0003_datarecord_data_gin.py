@@ -0,0 +1,44 @@
+# Generated by Django 4.2.26 on 2026-10-15 10:30
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+def create_gin_index(apps, schema_editor):
+    # GIN/jsonb_path_ops is PostgreSQL-only; other backends skip the index
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS data_records_data_gin '
+        'ON data_records USING gin (data jsonb_path_ops);'
+    )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS data_records_data_gin;')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0002_alter_datarecord_data'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='datarecord',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['data'], name='data_records_data_gin', opclasses=['jsonb_path_ops']),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_gin_index, drop_gin_index),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.26 on 2026-10-15 11:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_datarecord_data_gin'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='datarecord',
+            name='dataset',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='records', to='core.dataset'),
+        ),
+        migrations.AlterField(
+            model_name='datarecord',
+            name='row_number',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.26 on 2026-10-15 11:30
+
+import app.core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_drop_redundant_datarecord_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='datarecord',
+            name='data',
+            field=models.JSONField(decoder=app.core.models.OrjsonDecoder, encoder=app.core.models.OrjsonEncoder, help_text='Row data as JSON object'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.26 on 2026-10-15 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_alter_datarecord_data_decoder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='stats_cache',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='stats_cache_version',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.26 on 2026-10-15 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_dataset_stats_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='xml_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='xsd_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
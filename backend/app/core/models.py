@@ -5,9 +5,37 @@ This module provides a flexible architecture to handle any CSV structure.
 
 from django.db import models
 from django.contrib.postgres.fields import JSONField as PostgresJSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
+from functools import cached_property
 import json
+import orjson
+
+
+class OrjsonEncoder(DjangoJSONEncoder):
+    """
+    JSON encoder backed by orjson (C implementation).
+    Falls back to DjangoJSONEncoder.default for types orjson does not handle natively.
+    """
+    
+    def encode(self, o):
+        return orjson.dumps(
+            o,
+            default=self.default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        ).decode()
+
+
+class OrjsonDecoder(json.JSONDecoder):
+    """
+    JSON decoder backed by orjson, used when JSONField values are loaded from the database.
+    """
+    
+    def decode(self, s, *args, **kwargs):
+        return orjson.loads(s)
 
 
 class Dataset(models.Model):
@@ -47,6 +75,14 @@ class Dataset(models.Model):
     xml_file_path = models.CharField(max_length=500, blank=True, null=True)
     xml_schema_path = models.CharField(max_length=500, blank=True, null=True)
     
+    # XPath statistics of the generated XML, reset whenever the XML is regenerated
+    stats_cache = models.JSONField(default=dict, blank=True)
+    stats_cache_version = models.IntegerField(default=0)
+    
+    # Hash of the inputs of the generated XSD/XML; matching files are not regenerated
+    xsd_fingerprint = models.CharField(max_length=32, blank=True, default='')
+    xml_fingerprint = models.CharField(max_length=32, blank=True, default='')
+    
     class Meta:
         db_table = 'datasets'
         ordering = ['-created_at']
@@ -56,6 +92,24 @@ class Dataset(models.Model):
     def __str__(self):
         return f"{self.name} ({self.total_rows} rows)"
     
+    @cached_property
+    def columns_list(self):
+        """
+        Column layout ordered by position.
+        Cached on the instance and in the Django cache, keyed by updated_at so
+        any save of the dataset invalidates it.
+        """
+        key = f"ds:{self.id}:{self.updated_at.timestamp()}:columns"
+        return cache.get_or_set(
+            key,
+            lambda: list(
+                self.columns.order_by('position').values(
+                    'name', 'data_type', 'position', 'nullable', 'unique'
+                )
+            ),
+            3600
+        )
+    
     def mark_as_completed(self):
         """Mark dataset import as completed"""
         self.status = 'completed'
@@ -128,19 +182,27 @@ class DataRecord(models.Model):
     Uses JSON field for flexibility to accommodate any structure.
     """
     
+    # No standalone index: the (dataset, row_number) composite index covers
+    # dataset_id lookups through its leftmost prefix
     dataset = models.ForeignKey(
         Dataset, 
         on_delete=models.CASCADE, 
         related_name='records',
-        db_index=True
+        db_index=False
     )
     
     # Stores the actual row data as JSON
     # Example: {"product_id": "b12c721e", "product_name": "Lamb", "price_per_kg": 14.10, ...}
-    data = models.JSONField(help_text="Row data as JSON object")
+    # Filter with data__contains={'field': value} (rendered as @>) so the GIN index is used;
+    # data__field=value compiles to -> and falls back to a sequential scan.
+    data = models.JSONField(
+        encoder=OrjsonEncoder,
+        decoder=OrjsonDecoder,
+        help_text="Row data as JSON object"
+    )
     
     # Optional: Store original row number from CSV
-    row_number = models.IntegerField(null=True, blank=True, db_index=True)
+    row_number = models.IntegerField(null=True, blank=True)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
@@ -152,6 +214,7 @@ class DataRecord(models.Model):
         indexes = [
             models.Index(fields=['dataset', 'row_number']),
             models.Index(fields=['dataset', 'created_at']),
+            GinIndex(fields=['data'], name='data_records_data_gin', opclasses=['jsonb_path_ops']),
         ]
         verbose_name = 'Data Record'
         verbose_name_plural = 'Data Records'
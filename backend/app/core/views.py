@@ -3,6 +3,8 @@ Views for the core application
 """
 from django.shortcuts import render
 from django.http import JsonResponse
+from django.core.cache import cache
+from django.db.models import Count, Sum
 from app.core.models import Dataset, DataRecord
 
 
@@ -10,18 +12,23 @@ def index(request):
     """
     Dashboard homepage showing all datasets
     """
-    datasets = Dataset.objects.all().order_by('-created_at')
+    # Most recent datasets for display
+    datasets = Dataset.objects.all().order_by('-created_at')[:50]
     
-    # Calculate total statistics
-    total_datasets = datasets.count()
-    total_records = DataRecord.objects.count()
-    total_rows = sum(ds.total_rows for ds in datasets)
+    # Calculate total statistics in a single aggregate query
+    stats = Dataset.objects.aggregate(
+        total_datasets=Count('id'),
+        total_rows=Sum('total_rows')
+    )
+    
+    # Counting every record is expensive on large tables; cache it briefly
+    total_records = cache.get_or_set('total_records', DataRecord.objects.count, 60)
     
     context = {
         'datasets': datasets,
-        'total_datasets': total_datasets,
+        'total_datasets': stats['total_datasets'],
         'total_records': total_records,
-        'total_rows': total_rows,
+        'total_rows': stats['total_rows'] or 0,
     }
     
     return render(request, 'core/index.html', context)
@@ -29,18 +36,28 @@ def index(request):
 
 def dataset_detail(request, dataset_id):
     """
-    Dataset detail view
+    Dataset detail view with paginated records
     """
     from django.shortcuts import get_object_or_404
+    from django.core.paginator import Paginator
     
     dataset = get_object_or_404(Dataset, id=dataset_id)
-    columns = dataset.columns.all()
-    records = dataset.records.all()[:100]  # Show first 100 records
+    
+    # Evaluate columns once; the template iterates them several times
+    columns = list(
+        dataset.columns.only(
+            'name', 'data_type', 'position', 'nullable', 'unique_count', 'null_count'
+        ).order_by('position')
+    )
+    
+    records = dataset.records.only('row_number', 'data', 'created_at').order_by('row_number')
+    page = Paginator(records, 50).get_page(request.GET.get('page'))
     
     context = {
         'dataset': dataset,
         'columns': columns,
-        'records': records,
+        'records': page,
+        'page': page,
     }
     
     return render(request, 'core/dataset_detail.html', context)
@@ -3,7 +3,8 @@ Database management utilities and services.
 """
 
 from django.db import connection
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any, Sequence
+import io
 import logging
 
 logger = logging.getLogger(__name__)
@@ -39,6 +40,78 @@ class DatabaseManager:
             columns = [col[0] for col in cursor.description]
             return [dict(zip(columns, row)) for row in cursor.fetchall()]
     
+    @staticmethod
+    def _escape_copy_value(value: Any) -> str:
+        """Format a single value for PostgreSQL COPY TEXT format."""
+        if value is None:
+            return '\\N'
+        return (
+            str(value).replace('\\', '\\\\')
+                      .replace('\t', '\\t')
+                      .replace('\n', '\\n')
+                      .replace('\r', '\\r')
+        )
+    
+    @staticmethod
+    def copy_rows(table: str, columns: Sequence[str], rows_iter: Iterable[Sequence[Any]]) -> None:
+        """
+        Insert many rows in a single protocol round trip.
+        
+        Uses COPY FROM STDIN on PostgreSQL (psycopg3 cursor.copy or psycopg2
+        copy_expert) and falls back to executemany on other backends.
+        Values must already be database-ready (e.g. JSON columns as strings).
+        """
+        column_list = ', '.join(columns)
+        
+        with connection.cursor() as cursor:
+            if connection.vendor != 'postgresql':
+                placeholders = ', '.join(['%s'] * len(columns))
+                cursor.executemany(
+                    f"INSERT INTO {table} ({column_list}) VALUES ({placeholders})",
+                    list(rows_iter)
+                )
+                return
+            
+            copy_sql = f"COPY {table} ({column_list}) FROM STDIN"
+            
+            if connection.Database.__name__ == 'psycopg':
+                # psycopg3: stream rows straight into the COPY protocol
+                with cursor.copy(copy_sql) as copy:
+                    for row in rows_iter:
+                        copy.write_row(row)
+                return
+            
+            # psycopg2: build a COPY TEXT buffer and send it with copy_expert
+            buffer = io.StringIO()
+            for row in rows_iter:
+                buffer.write('\t'.join(DatabaseManager._escape_copy_value(v) for v in row))
+                buffer.write('\n')
+            buffer.seek(0)
+            cursor.copy_expert(f"{copy_sql} WITH (FORMAT text)", buffer)
+    
+    # Below this many (estimated) rows an exact COUNT(*) is cheap enough
+    FAST_COUNT_THRESHOLD = 10000
+    
+    @staticmethod
+    def fast_count(model) -> int:
+        """
+        Row count of a model's table.
+        On PostgreSQL, large tables report the planner estimate (pg_class.reltuples,
+        refreshed by VACUUM/ANALYZE) instead of scanning for an exact COUNT(*).
+        """
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            # reltuples is -1 until the table has been analyzed
+            if row and row[0] > DatabaseManager.FAST_COUNT_THRESHOLD:
+                return row[0]
+        
+        return model.objects.count()
+    
     @staticmethod
     def get_table_info(table_name: str) -> Dict[str, Any]:
         """Get information about a specific table"""
@@ -64,5 +137,5 @@ class DatabaseManager:
             connection.ensure_connection()
             return True
         except Exception as e:
-            logger.error(f"Database connection failed: {e}")
+            logger.error("Database connection failed: %s", e)
             return False
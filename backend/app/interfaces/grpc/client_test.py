@@ -3,17 +3,71 @@ gRPC Client Example for IPVC Integration System
 """
 
 import grpc
+import itertools
 import json
 from protos import dataset_service_pb2
 from protos import dataset_service_pb2_grpc
 
+SERVER_ADDRESS = 'localhost:50052'
+CHANNEL_POOL_SIZE = 4
+
+# Channels are expensive (TCP + HTTP/2 handshake): create them once and reuse them.
+# Several independent channels avoid head-of-line blocking on a single connection
+# when many calls run concurrently.
+_channel_pool = []
+_stub_cycle = None
+
+
+def next_stub():
+    """Return a stub bound to the next channel of the shared pool (round-robin)"""
+    global _stub_cycle
+    
+    if _stub_cycle is None:
+        for _ in range(CHANNEL_POOL_SIZE):
+            _channel_pool.append(grpc.insecure_channel(
+                SERVER_ADDRESS,
+                options=[
+                    ('grpc.use_local_subchannel_pool', 1),
+                    ('grpc.http2.bdp_probe', 1),
+                    ('grpc.max_receive_message_length', 64 << 20),
+                ]
+            ))
+        _stub_cycle = itertools.cycle(
+            [dataset_service_pb2_grpc.DatasetServiceStub(channel) for channel in _channel_pool]
+        )
+    
+    return next(_stub_cycle)
+
+
+def iter_record_pages(stub, dataset_id, page_size=100):
+    """
+    Retrieve all records of a dataset over a single StreamDatasetRecords call,
+    yielding them in pages of `page_size`.
+    
+    Prefer this over looping GetDatasetRecords with increasing offsets: one
+    long-lived stream replaces N unary calls and N LIMIT/OFFSET queries.
+    """
+    request = dataset_service_pb2.StreamRecordsRequest(
+        dataset_id=dataset_id,
+        batch_size=page_size
+    )
+    
+    page = []
+    for record in stub.StreamDatasetRecords(request):
+        page.append(record)
+        if len(page) >= page_size:
+            yield page
+            page = []
+    
+    if page:
+        yield page
+
 
 def run_tests():
     """Run gRPC client tests"""
     
-    # Connect to gRPC server
-    channel = grpc.insecure_channel('localhost:50052')
-    stub = dataset_service_pb2_grpc.DatasetServiceStub(channel)
+    # Connect to gRPC server (shared channel pool)
+    stub = next_stub()
     
     print("="*80)
     print("🚀 IPVC Integration System - gRPC Client Tests")
@@ -86,6 +140,7 @@ def run_tests():
         print(f"Retrieved: {len(response.records)} records")
         print(f"\nRecords:")
         for record in response.records[:3]:  # Show first 3
+            # data_json keeps integer columns exact; the data Struct holds every number as a double
             data = json.loads(record.data_json)
             print(f"  • Row {record.row_number}:")
             # Show first 3 fields
@@ -145,19 +200,13 @@ def run_tests():
     print(f"\n\n🔍 TEST 6: Stream Dataset Records (ID={dataset_id}, batch_size=10)")
     print("-"*80)
     try:
-        request = dataset_service_pb2.StreamRecordsRequest(
-            dataset_id=dataset_id,
-            batch_size=10
-        )
-        
         record_count = 0
-        for record in stub.StreamDatasetRecords(request):
+        pages = iter_record_pages(stub, dataset_id, page_size=10)
+        for record in next(pages, []):
             record_count += 1
             if record_count <= 3:  # Show first 3
-                data = json.loads(record.data_json)
-                print(f"  • Row {record.row_number}: {list(data.keys())[:3]}...")
-            elif record_count == 10:
-                break
+                print(f"  • Row {record.row_number}: {list(record.data.keys())[:3]}...")
+        pages.close()
         
         print(f"\nStreamed {record_count} records")
         
@@ -22,43 +22,44 @@ _runtime_version.ValidateProtobufRuntimeVersion(
 _sym_db = _symbol_database.Default()
 
 
+from google.protobuf import struct_pb2 as google_dot_protobuf_dot_struct__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x1cprotos/dataset_service.proto\x12\x10ipvc.integration\"6\n\x13ListDatasetsRequest\x12\x0c\n\x04page\x18\x01 \x01(\x05\x12\x11\n\tpage_size\x18\x02 \x01(\x05\"\x80\x01\n\x14ListDatasetsResponse\x12\x32\n\x08\x64\x61tasets\x18\x01 \x03(\x0b\x32 .ipvc.integration.DatasetSummary\x12\x13\n\x0btotal_count\x18\x02 \x01(\x05\x12\x0c\n\x04page\x18\x03 \x01(\x05\x12\x11\n\tpage_size\x18\x04 \x01(\x05\"\x1f\n\x11GetDatasetRequest\x12\n\n\x02id\x18\x01 \x01(\x05\"M\n\x18GetDatasetRecordsRequest\x12\x12\n\ndataset_id\x18\x01 \x01(\x05\x12\r\n\x05limit\x18\x02 \x01(\x05\x12\x0e\n\x06offset\x18\x03 \x01(\x05\"}\n\x19GetDatasetRecordsResponse\x12-\n\x07records\x18\x01 \x03(\x0b\x32\x1c.ipvc.integration.DataRecord\x12\x12\n\ntotal_rows\x18\x02 \x01(\x05\x12\x0e\n\x06offset\x18\x03 \x01(\x05\x12\r\n\x05limit\x18\x04 \x01(\x05\"_\n\x12GenerateXMLRequest\x12\x12\n\ndataset_id\x18\x01 \x01(\x05\x12\r\n\x05limit\x18\x02 \x01(\x05\x12\x14\n\x0cgenerate_xsd\x18\x03 \x01(\x08\x12\x10\n\x08validate\x18\x04 \x01(\x08\"\xb3\x01\n\x13GenerateXMLResponse\x12\x14\n\x0c\x64\x61taset_name\x18\x01 \x01(\t\x12\x15\n\rxsd_generated\x18\x02 \x01(\x08\x12\x10\n\x08xsd_path\x18\x03 \x01(\t\x12\x15\n\rxml_generated\x18\x04 \x01(\x08\x12\x10\n\x08xml_path\x18\x05 \x01(\t\x12\x19\n\x11validation_passed\x18\x06 \x01(\x08\x12\x19\n\x11validation_errors\x18\x07 \x03(\t\"(\n\x12ValidateXMLRequest\x12\x12\n\ndataset_id\x18\x01 \x01(\x05\"M\n\x13ValidateXMLResponse\x12\x14\n\x0c\x64\x61taset_name\x18\x01 \x01(\t\x12\x10\n\x08is_valid\x18\x02 \x01(\x08\x12\x0e\n\x06\x65rrors\x18\x03 \x03(\t\">\n\x14StreamRecordsRequest\x12\x12\n\ndataset_id\x18\x01 \x01(\x05\x12\x12\n\nbatch_size\x18\x02 \x01(\x05\"\xa2\x01\n\x0e\x44\x61tasetSummary\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x03 \x01(\t\x12\x12\n\ntotal_rows\x18\x04 \x01(\x05\x12\x15\n\rtotal_columns\x18\x05 \x01(\x05\x12\x0e\n\x06status\x18\x06 \x01(\t\x12\x12\n\ncreated_at\x18\x07 \x01(\t\x12\x12\n\nupdated_at\x18\x08 \x01(\t\"\xa7\x02\n\x07\x44\x61taset\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x03 \x01(\t\x12\x13\n\x0bsource_file\x18\x04 \x01(\t\x12\x12\n\ntotal_rows\x18\x05 \x01(\x05\x12\x15\n\rtotal_columns\x18\x06 \x01(\x05\x12\x0e\n\x06status\x18\x07 \x01(\t\x12\x12\n\ncreated_at\x18\x08 \x01(\t\x12\x12\n\nupdated_at\x18\t \x01(\t\x12\x13\n\x0bimported_at\x18\n \x01(\t\x12\x15\n\rxml_file_path\x18\x0b \x01(\t\x12\x17\n\x0fxml_schema_path\x18\x0c \x01(\t\x12\x30\n\x07\x63olumns\x18\r \x03(\x0b\x32\x1f.ipvc.integration.DatasetColumn\"\xc6\x01\n\rDatasetColumn\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x11\n\tdata_type\x18\x03 \x01(\t\x12\x10\n\x08nullable\x18\x04 \x01(\x08\x12\x0e\n\x06unique\x18\x05 \x01(\x08\x12\x13\n\x0bprimary_key\x18\x06 \x01(\x08\x12\x12\n\nnull_count\x18\x07 \x01(\x05\x12\x14\n\x0cunique_count\x18\x08 \x01(\x05\x12\x10\n\x08position\x18\t \x01(\x05\x12\x15\n\rsample_values\x18\n \x03(\t\"g\n\nDataRecord\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x12\n\ndataset_id\x18\x02 \x01(\x05\x12\x12\n\nrow_number\x18\x03 \x01(\x05\x12\x11\n\tdata_json\x18\x04 \x01(\t\x12\x12\n\ncreated_at\x18\x05 \x01(\t2\xc3\x04\n\x0e\x44\x61tasetService\x12]\n\x0cListDatasets\x12%.ipvc.integration.ListDatasetsRequest\x1a&.ipvc.integration.ListDatasetsResponse\x12L\n\nGetDataset\x12#.ipvc.integration.GetDatasetRequest\x1a\x19.ipvc.integration.Dataset\x12l\n\x11GetDatasetRecords\x12*.ipvc.integration.GetDatasetRecordsRequest\x1a+.ipvc.integration.GetDatasetRecordsResponse\x12Z\n\x0bGenerateXML\x12$.ipvc.integration.GenerateXMLRequest\x1a%.ipvc.integration.GenerateXMLResponse\x12Z\n\x0bValidateXML\x12$.ipvc.integration.ValidateXMLRequest\x1a%.ipvc.integration.ValidateXMLResponse\x12^\n\x14StreamDatasetRecords\x12&.ipvc.integration.StreamRecordsRequest\x1a\x1c.ipvc.integration.DataRecord0\x01\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x1cprotos/dataset_service.proto\x12\x10ipvc.integration\x1a\x1cgoogle/protobuf/struct.proto\"6\n\x13ListDatasetsRequest\x12\x0c\n\x04page\x18\x01 \x01(\x05\x12\x11\n\tpage_size\x18\x02 \x01(\x05\"\x80\x01\n\x14ListDatasetsResponse\x12\x32\n\x08\x64\x61tasets\x18\x01 \x03(\x0b\x32 .ipvc.integration.DatasetSummary\x12\x13\n\x0btotal_count\x18\x02 \x01(\x05\x12\x0c\n\x04page\x18\x03 \x01(\x05\x12\x11\n\tpage_size\x18\x04 \x01(\x05\"\x1f\n\x11GetDatasetRequest\x12\n\n\x02id\x18\x01 \x01(\x05\"M\n\x18GetDatasetRecordsRequest\x12\x12\n\ndataset_id\x18\x01 \x01(\x05\x12\r\n\x05limit\x18\x02 \x01(\x05\x12\x0e\n\x06offset\x18\x03 \x01(\x05\"}\n\x19GetDatasetRecordsResponse\x12-\n\x07records\x18\x01 \x03(\x0b\x32\x1c.ipvc.integration.DataRecord\x12\x12\n\ntotal_rows\x18\x02 \x01(\x05\x12\x0e\n\x06offset\x18\x03 \x01(\x05\x12\r\n\x05limit\x18\x04 \x01(\x05\"_\n\x12GenerateXMLRequest\x12\x12\n\ndataset_id\x18\x01 \x01(\x05\x12\r\n\x05limit\x18\x02 \x01(\x05\x12\x14\n\x0cgenerate_xsd\x18\x03 \x01(\x08\x12\x10\n\x08validate\x18\x04 \x01(\x08\"\xb3\x01\n\x13GenerateXMLResponse\x12\x14\n\x0c\x64\x61taset_name\x18\x01 \x01(\t\x12\x15\n\rxsd_generated\x18\x02 \x01(\x08\x12\x10\n\x08xsd_path\x18\x03 \x01(\t\x12\x15\n\rxml_generated\x18\x04 \x01(\x08\x12\x10\n\x08xml_path\x18\x05 \x01(\t\x12\x19\n\x11validation_passed\x18\x06 \x01(\x08\x12\x19\n\x11validation_errors\x18\x07 \x03(\t\"(\n\x12ValidateXMLRequest\x12\x12\n\ndataset_id\x18\x01 \x01(\x05\"M\n\x13ValidateXMLResponse\x12\x14\n\x0c\x64\x61taset_name\x18\x01 \x01(\t\x12\x10\n\x08is_valid\x18\x02 \x01(\x08\x12\x0e\n\x06\x65rrors\x18\x03 \x03(\t\">\n\x14StreamRecordsRequest\x12\x12\n\ndataset_id\x18\x01 \x01(\x05\x12\x12\n\nbatch_size\x18\x02 \x01(\x05\"\xda\x01\n\x0e\x44\x61tasetSummary\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x03 \x01(\t\x12\x12\n\ntotal_rows\x18\x04 \x01(\x05\x12\x15\n\rtotal_columns\x18\x05 \x01(\x05\x12\x0e\n\x06status\x18\x06 \x01(\t\x12\x12\n\ncreated_at\x18\x07 \x01(\t\x12\x12\n\nupdated_at\x18\x08 \x01(\t\x12\x1a\n\x12\x63reated_at_unix_us\x18\t \x01(\x03\x12\x1a\n\x12updated_at_unix_us\x18\n \x01(\x03\"\xfc\x02\n\x07\x44\x61taset\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x03 \x01(\t\x12\x13\n\x0bsource_file\x18\x04 \x01(\t\x12\x12\n\ntotal_rows\x18\x05 \x01(\x05\x12\x15\n\rtotal_columns\x18\x06 \x01(\x05\x12\x0e\n\x06status\x18\x07 \x01(\t\x12\x12\n\ncreated_at\x18\x08 \x01(\t\x12\x12\n\nupdated_at\x18\t \x01(\t\x12\x13\n\x0bimported_at\x18\n \x01(\t\x12\x15\n\rxml_file_path\x18\x0b \x01(\t\x12\x17\n\x0fxml_schema_path\x18\x0c \x01(\t\x12\x30\n\x07\x63olumns\x18\r \x03(\x0b\x32\x1f.ipvc.integration.DatasetColumn\x12\x1a\n\x12\x63reated_at_unix_us\x18\x0e \x01(\x03\x12\x1a\n\x12updated_at_unix_us\x18\x0f \x01(\x03\x12\x1b\n\x13imported_at_unix_us\x18\x10 \x01(\x03\"\xc6\x01\n\rDatasetColumn\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x11\n\tdata_type\x18\x03 \x01(\t\x12\x10\n\x08nullable\x18\x04 \x01(\x08\x12\x0e\n\x06unique\x18\x05 \x01(\x08\x12\x13\n\x0bprimary_key\x18\x06 \x01(\x08\x12\x12\n\nnull_count\x18\x07 \x01(\x05\x12\x14\n\x0cunique_count\x18\x08 \x01(\x05\x12\x10\n\x08position\x18\t \x01(\x05\x12\x15\n\rsample_values\x18\n \x03(\t\"\xaa\x01\n\nDataRecord\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x12\n\ndataset_id\x18\x02 \x01(\x05\x12\x12\n\nrow_number\x18\x03 \x01(\x05\x12\x11\n\tdata_json\x18\x04 \x01(\t\x12\x12\n\ncreated_at\x18\x05 \x01(\t\x12%\n\x04\x64\x61ta\x18\x06 \x01(\x0b\x32\x17.google.protobuf.Struct\x12\x1a\n\x12\x63reated_at_unix_us\x18\x07 \x01(\x03\x32\xc3\x04\n\x0e\x44\x61tasetService\x12]\n\x0cListDatasets\x12%.ipvc.integration.ListDatasetsRequest\x1a&.ipvc.integration.ListDatasetsResponse\x12L\n\nGetDataset\x12#.ipvc.integration.GetDatasetRequest\x1a\x19.ipvc.integration.Dataset\x12l\n\x11GetDatasetRecords\x12*.ipvc.integration.GetDatasetRecordsRequest\x1a+.ipvc.integration.GetDatasetRecordsResponse\x12Z\n\x0bGenerateXML\x12$.ipvc.integration.GenerateXMLRequest\x1a%.ipvc.integration.GenerateXMLResponse\x12Z\n\x0bValidateXML\x12$.ipvc.integration.ValidateXMLRequest\x1a%.ipvc.integration.ValidateXMLResponse\x12^\n\x14StreamDatasetRecords\x12&.ipvc.integration.StreamRecordsRequest\x1a\x1c.ipvc.integration.DataRecord0\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'protos.dataset_service_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_LISTDATASETSREQUEST']._serialized_start=50
-  _globals['_LISTDATASETSREQUEST']._serialized_end=104
-  _globals['_LISTDATASETSRESPONSE']._serialized_start=107
-  _globals['_LISTDATASETSRESPONSE']._serialized_end=235
-  _globals['_GETDATASETREQUEST']._serialized_start=237
-  _globals['_GETDATASETREQUEST']._serialized_end=268
-  _globals['_GETDATASETRECORDSREQUEST']._serialized_start=270
-  _globals['_GETDATASETRECORDSREQUEST']._serialized_end=347
-  _globals['_GETDATASETRECORDSRESPONSE']._serialized_start=349
-  _globals['_GETDATASETRECORDSRESPONSE']._serialized_end=474
-  _globals['_GENERATEXMLREQUEST']._serialized_start=476
-  _globals['_GENERATEXMLREQUEST']._serialized_end=571
-  _globals['_GENERATEXMLRESPONSE']._serialized_start=574
-  _globals['_GENERATEXMLRESPONSE']._serialized_end=753
-  _globals['_VALIDATEXMLREQUEST']._serialized_start=755
-  _globals['_VALIDATEXMLREQUEST']._serialized_end=795
-  _globals['_VALIDATEXMLRESPONSE']._serialized_start=797
-  _globals['_VALIDATEXMLRESPONSE']._serialized_end=874
-  _globals['_STREAMRECORDSREQUEST']._serialized_start=876
-  _globals['_STREAMRECORDSREQUEST']._serialized_end=938
-  _globals['_DATASETSUMMARY']._serialized_start=941
-  _globals['_DATASETSUMMARY']._serialized_end=1103
-  _globals['_DATASET']._serialized_start=1106
-  _globals['_DATASET']._serialized_end=1401
-  _globals['_DATASETCOLUMN']._serialized_start=1404
-  _globals['_DATASETCOLUMN']._serialized_end=1602
-  _globals['_DATARECORD']._serialized_start=1604
-  _globals['_DATARECORD']._serialized_end=1707
-  _globals['_DATASETSERVICE']._serialized_start=1710
-  _globals['_DATASETSERVICE']._serialized_end=2289
+  _globals['_LISTDATASETSREQUEST']._serialized_start=80
+  _globals['_LISTDATASETSREQUEST']._serialized_end=134
+  _globals['_LISTDATASETSRESPONSE']._serialized_start=137
+  _globals['_LISTDATASETSRESPONSE']._serialized_end=265
+  _globals['_GETDATASETREQUEST']._serialized_start=267
+  _globals['_GETDATASETREQUEST']._serialized_end=298
+  _globals['_GETDATASETRECORDSREQUEST']._serialized_start=300
+  _globals['_GETDATASETRECORDSREQUEST']._serialized_end=377
+  _globals['_GETDATASETRECORDSRESPONSE']._serialized_start=379
+  _globals['_GETDATASETRECORDSRESPONSE']._serialized_end=504
+  _globals['_GENERATEXMLREQUEST']._serialized_start=506
+  _globals['_GENERATEXMLREQUEST']._serialized_end=601
+  _globals['_GENERATEXMLRESPONSE']._serialized_start=604
+  _globals['_GENERATEXMLRESPONSE']._serialized_end=783
+  _globals['_VALIDATEXMLREQUEST']._serialized_start=785
+  _globals['_VALIDATEXMLREQUEST']._serialized_end=825
+  _globals['_VALIDATEXMLRESPONSE']._serialized_start=827
+  _globals['_VALIDATEXMLRESPONSE']._serialized_end=904
+  _globals['_STREAMRECORDSREQUEST']._serialized_start=906
+  _globals['_STREAMRECORDSREQUEST']._serialized_end=968
+  _globals['_DATASETSUMMARY']._serialized_start=971
+  _globals['_DATASETSUMMARY']._serialized_end=1189
+  _globals['_DATASET']._serialized_start=1192
+  _globals['_DATASET']._serialized_end=1572
+  _globals['_DATASETCOLUMN']._serialized_start=1575
+  _globals['_DATASETCOLUMN']._serialized_end=1773
+  _globals['_DATARECORD']._serialized_start=1776
+  _globals['_DATARECORD']._serialized_end=1946
+  _globals['_DATASETSERVICE']._serialized_start=1949
+  _globals['_DATASETSERVICE']._serialized_end=2528
 # @@protoc_insertion_point(module_scope)
@@ -86,7 +86,7 @@ class DatasetServiceServicer(object):
         raise NotImplementedError('Method not implemented!')
 
     def GetDatasetRecords(self, request, context):
-        """Get dataset records
+        """Get a single page of dataset records (use StreamDatasetRecords for bulk retrieval)
         """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
@@ -2,11 +2,12 @@
 gRPC Server Implementation for IPVC Integration System
 """
 
+import asyncio
+import functools
 import grpc
-from concurrent import futures
-import json
 import logging
-from datetime import datetime
+import orjson
+from datetime import datetime, timedelta, timezone
 
 # Django setup
 import os
@@ -18,7 +19,14 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 django.setup()
 
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.db.models import Count, TextField, Window
+from django.db.models.functions import Cast
+from google.protobuf.internal import api_implementation
+
 from app.core.models import Dataset, DatasetColumn, DataRecord
+from app.database.manager import DatabaseManager
 from app.xml_tools.xml_service import XMLService
 
 # Import generated gRPC code
@@ -30,262 +38,388 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Record data read as the database's own JSON text (data::text on PostgreSQL):
+# it fills data_json as-is and is parsed once for the Struct payload
+DATA_AS_TEXT = Cast('data', TextField())
+
+# Larger frames and BDP probing let long record streams grow the HTTP/2
+# flow-control window instead of stalling on the 64 KiB default
+SERVER_OPTIONS = [
+    ('grpc.http2.max_frame_size', 1 << 20),
+    ('grpc.http2.bdp_probe', 1),
+    ('grpc.max_send_message_length', 64 << 20),
+]
+
+
+# Built Dataset messages kept per (dataset id, updated_at) version
+DATASET_MESSAGE_CACHE_SIZE = 64
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def unix_us(value):
+    """Aware datetime -> integer microseconds since the Unix epoch (exact, no float)"""
+    return (value - EPOCH) // ONE_MICROSECOND
+
+
+def run_in_thread(func):
+    """
+    Run blocking Django ORM work in a worker thread so the event loop stays free.
+    thread_sensitive=False lets independent RPCs hit the database concurrently.
+    Worker threads keep their connection across calls; like Django's request
+    cycle, it is dropped once past CONN_MAX_AGE or when it has gone bad.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    
+    return sync_to_async(wrapper, thread_sensitive=False)
+
+
 class DatasetServicer(dataset_service_pb2_grpc.DatasetServiceServicer):
     """
     Implementation of DatasetService gRPC interface
     """
     
-    def ListDatasets(self, request, context):
+    async def ListDatasets(self, request, context):
         """List all datasets with pagination"""
         try:
-            page = request.page or 1
-            page_size = request.page_size or 50
-            
-            # Calculate offset
-            offset = (page - 1) * page_size
-            
-            # Query datasets
-            total_count = Dataset.objects.count()
-            datasets = Dataset.objects.all().order_by('-created_at')[offset:offset+page_size]
-            
-            # Convert to protobuf messages
-            dataset_summaries = []
-            for dataset in datasets:
-                summary = dataset_service_pb2.DatasetSummary(
-                    id=dataset.id,
-                    name=dataset.name,
-                    description=dataset.description or "",
-                    total_rows=dataset.total_rows,
-                    total_columns=dataset.total_columns,
-                    status=dataset.status,
-                    created_at=dataset.created_at.isoformat(),
-                    updated_at=dataset.updated_at.isoformat()
-                )
-                dataset_summaries.append(summary)
-            
-            return dataset_service_pb2.ListDatasetsResponse(
-                datasets=dataset_summaries,
-                total_count=total_count,
-                page=page,
-                page_size=page_size
-            )
-            
+            return await run_in_thread(self._list_datasets)(request)
         except Exception as e:
-            logger.error(f"Error listing datasets: {e}")
+            logger.error("Error listing datasets: %s", e)
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(str(e))
             return dataset_service_pb2.ListDatasetsResponse()
     
-    def GetDataset(self, request, context):
+    async def GetDataset(self, request, context):
         """Get detailed dataset information"""
         try:
-            dataset = Dataset.objects.get(id=request.id)
-            columns = dataset.columns.all().order_by('position')
-            
-            # Convert columns to protobuf
-            column_messages = []
-            for col in columns:
-                col_msg = dataset_service_pb2.DatasetColumn(
-                    id=col.id,
-                    name=col.name,
-                    data_type=col.data_type,
-                    nullable=col.nullable,
-                    unique=col.unique,
-                    primary_key=col.primary_key,
-                    null_count=col.null_count,
-                    unique_count=col.unique_count,
-                    position=col.position,
-                    sample_values=col.sample_values or []
-                )
-                column_messages.append(col_msg)
-            
-            # Create dataset message
-            return dataset_service_pb2.Dataset(
-                id=dataset.id,
-                name=dataset.name,
-                description=dataset.description or "",
-                source_file=dataset.source_file or "",
-                total_rows=dataset.total_rows,
-                total_columns=dataset.total_columns,
-                status=dataset.status,
-                created_at=dataset.created_at.isoformat(),
-                updated_at=dataset.updated_at.isoformat(),
-                imported_at=dataset.imported_at.isoformat() if dataset.imported_at else "",
-                xml_file_path=dataset.xml_file_path or "",
-                xml_schema_path=dataset.xml_schema_path or "",
-                columns=column_messages
-            )
-            
+            return await run_in_thread(self._get_dataset)(request)
         except Dataset.DoesNotExist:
             context.set_code(grpc.StatusCode.NOT_FOUND)
             context.set_details(f"Dataset with id {request.id} not found")
             return dataset_service_pb2.Dataset()
         except Exception as e:
-            logger.error(f"Error getting dataset: {e}")
+            logger.error("Error getting dataset: %s", e)
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(str(e))
             return dataset_service_pb2.Dataset()
     
-    def GetDatasetRecords(self, request, context):
+    async def GetDatasetRecords(self, request, context):
         """Get dataset records with pagination"""
         try:
-            dataset = Dataset.objects.get(id=request.dataset_id)
-            
-            limit = request.limit or 100
-            offset = request.offset or 0
-            
-            # Get records
-            records = dataset.records.all().order_by('row_number')[offset:offset+limit]
-            
-            # Convert to protobuf
-            record_messages = []
-            for record in records:
-                rec_msg = dataset_service_pb2.DataRecord(
-                    id=record.id,
-                    dataset_id=dataset.id,
-                    row_number=record.row_number,
-                    data_json=json.dumps(record.data),
-                    created_at=record.created_at.isoformat()
-                )
-                record_messages.append(rec_msg)
-            
-            return dataset_service_pb2.GetDatasetRecordsResponse(
-                records=record_messages,
-                total_rows=dataset.total_rows,
-                offset=offset,
-                limit=limit
-            )
-            
+            return await run_in_thread(self._get_dataset_records)(request)
         except Dataset.DoesNotExist:
             context.set_code(grpc.StatusCode.NOT_FOUND)
             context.set_details(f"Dataset with id {request.dataset_id} not found")
             return dataset_service_pb2.GetDatasetRecordsResponse()
         except Exception as e:
-            logger.error(f"Error getting records: {e}")
+            logger.error("Error getting records: %s", e)
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(str(e))
             return dataset_service_pb2.GetDatasetRecordsResponse()
     
-    def GenerateXML(self, request, context):
+    async def GenerateXML(self, request, context):
         """Generate XML and optionally XSD for dataset"""
         try:
-            dataset = Dataset.objects.get(id=request.dataset_id)
-            xml_service = XMLService(dataset)
-            
-            result = dataset_service_pb2.GenerateXMLResponse(
-                dataset_name=dataset.name,
-                xsd_generated=False,
-                xml_generated=False
-            )
-            
-            # Generate XSD
-            if request.generate_xsd:
-                xsd_path = xml_service.generate_xsd()
-                result.xsd_generated = True
-                result.xsd_path = xsd_path
-            
-            # Generate XML
-            limit = request.limit if request.limit > 0 else None
-            xml_path = xml_service.generate_xml(limit=limit)
-            result.xml_generated = True
-            result.xml_path = xml_path
-            
-            # Validate
-            if request.validate:
-                is_valid, errors = xml_service.validate_xml()
-                result.validation_passed = is_valid
-                result.validation_errors.extend(errors)
-            
-            return result
-            
+            return await run_in_thread(self._generate_xml)(request)
         except Dataset.DoesNotExist:
             context.set_code(grpc.StatusCode.NOT_FOUND)
             context.set_details(f"Dataset with id {request.dataset_id} not found")
             return dataset_service_pb2.GenerateXMLResponse()
         except Exception as e:
-            logger.error(f"Error generating XML: {e}")
+            logger.error("Error generating XML: %s", e)
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(str(e))
             return dataset_service_pb2.GenerateXMLResponse()
     
-    def ValidateXML(self, request, context):
+    async def ValidateXML(self, request, context):
         """Validate existing XML against XSD"""
         try:
-            dataset = Dataset.objects.get(id=request.dataset_id)
-            xml_service = XMLService(dataset)
-            
-            is_valid, errors = xml_service.validate_xml()
-            
-            return dataset_service_pb2.ValidateXMLResponse(
-                dataset_name=dataset.name,
-                is_valid=is_valid,
-                errors=errors
-            )
-            
+            return await run_in_thread(self._validate_xml)(request)
         except Dataset.DoesNotExist:
             context.set_code(grpc.StatusCode.NOT_FOUND)
             context.set_details(f"Dataset with id {request.dataset_id} not found")
             return dataset_service_pb2.ValidateXMLResponse()
         except Exception as e:
-            logger.error(f"Error validating XML: {e}")
+            logger.error("Error validating XML: %s", e)
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(str(e))
             return dataset_service_pb2.ValidateXMLResponse()
     
-    def StreamDatasetRecords(self, request, context):
+    def _list_datasets(self, request):
+        """Blocking ORM work for ListDatasets (runs in a worker thread)"""
+        page = request.page or 1
+        page_size = request.page_size or 50
+        
+        # Calculate offset
+        offset = (page - 1) * page_size
+        
+        # Query only the summary fields; COUNT(*) OVER () carries the total
+        # on every row so page and count come back in one round trip
+        rows = list(
+            Dataset.objects.annotate(
+                total_count=Window(expression=Count('id'))
+            ).values(
+                'id', 'name', 'description', 'total_rows', 'total_columns',
+                'status', 'created_at', 'updated_at', 'total_count'
+            ).order_by('-created_at')[offset:offset+page_size]
+        )
+        
+        # Pages past the end return no rows to carry the total
+        total_count = rows[0]['total_count'] if rows else DatabaseManager.fast_count(Dataset)
+        
+        response = dataset_service_pb2.ListDatasetsResponse(
+            total_count=total_count,
+            page=page,
+            page_size=page_size
+        )
+        
+        # Add summaries in place on the repeated field (no intermediate list)
+        for row in rows:
+            response.datasets.add(
+                id=row['id'],
+                name=row['name'],
+                description=row['description'] or "",
+                total_rows=row['total_rows'],
+                total_columns=row['total_columns'],
+                status=row['status'],
+                created_at=row['created_at'].isoformat(),
+                updated_at=row['updated_at'].isoformat(),
+                created_at_unix_us=unix_us(row['created_at']),
+                updated_at_unix_us=unix_us(row['updated_at'])
+            )
+        
+        return response
+    
+    def _get_dataset(self, request):
+        """Blocking ORM work for GetDataset (runs in a worker thread)"""
+        updated_at = Dataset.objects.filter(id=request.id).values_list(
+            'updated_at', flat=True
+        ).first()
+        if updated_at is None:
+            raise Dataset.DoesNotExist
+        
+        # Every save bumps updated_at, so the built message is reused until
+        # the dataset changes
+        return self._dataset_message(request.id, updated_at)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=DATASET_MESSAGE_CACHE_SIZE)
+    def _dataset_message(dataset_id, updated_at):
+        """
+        Full Dataset message, columns included, for one version of a dataset.
+        The returned message is shared between calls and must not be modified.
+        """
+        dataset = Dataset.objects.get(id=dataset_id)
+        # Create dataset message
+        dataset_msg = dataset_service_pb2.Dataset(
+            id=dataset.id,
+            name=dataset.name,
+            description=dataset.description or "",
+            source_file=dataset.source_file or "",
+            total_rows=dataset.total_rows,
+            total_columns=dataset.total_columns,
+            status=dataset.status,
+            created_at=dataset.created_at.isoformat(),
+            updated_at=dataset.updated_at.isoformat(),
+            imported_at=dataset.imported_at.isoformat() if dataset.imported_at else "",
+            created_at_unix_us=unix_us(dataset.created_at),
+            updated_at_unix_us=unix_us(dataset.updated_at),
+            imported_at_unix_us=unix_us(dataset.imported_at) if dataset.imported_at else 0,
+            xml_file_path=dataset.xml_file_path or "",
+            xml_schema_path=dataset.xml_schema_path or ""
+        )
+        
+        # Build the repeated columns field straight from value dicts
+        columns = dataset.columns.values(
+            'id', 'name', 'data_type', 'nullable', 'unique', 'primary_key',
+            'null_count', 'unique_count', 'position', 'sample_values'
+        ).order_by('position')
+        dataset_msg.columns.extend(
+            dataset_service_pb2.DatasetColumn(
+                **{**col, 'sample_values': col['sample_values'] or []}
+            )
+            for col in columns
+        )
+        
+        return dataset_msg
+    
+    def _get_dataset_records(self, request):
+        """Blocking ORM work for GetDatasetRecords (runs in a worker thread)"""
+        dataset = Dataset.objects.get(id=request.dataset_id)
+        
+        limit = request.limit or 100
+        offset = request.offset or 0
+        
+        # Get records as lightweight dicts (no model instantiation)
+        records = dataset.records.values(
+            'id', 'row_number', 'created_at', data_json=DATA_AS_TEXT
+        ).order_by('row_number')[offset:offset+limit]
+        
+        response = dataset_service_pb2.GetDatasetRecordsResponse(
+            total_rows=dataset.total_rows,
+            offset=offset,
+            limit=limit
+        )
+        
+        # Add records in place on the repeated field (no intermediate list)
+        for record in records:
+            rec_msg = response.records.add(
+                id=record['id'],
+                dataset_id=dataset.id,
+                row_number=record['row_number'],
+                data_json=record['data_json'],
+                created_at=record['created_at'].isoformat(),
+                created_at_unix_us=unix_us(record['created_at'])
+            )
+            rec_msg.data.update(orjson.loads(record['data_json']))
+        
+        return response
+    
+    def _generate_xml(self, request):
+        """Blocking ORM work for GenerateXML (runs in a worker thread)"""
+        dataset = Dataset.objects.get(id=request.dataset_id)
+        xml_service = XMLService(dataset)
+        
+        result = dataset_service_pb2.GenerateXMLResponse(
+            dataset_name=dataset.name,
+            xsd_generated=False,
+            xml_generated=False
+        )
+        
+        # Generate XSD
+        if request.generate_xsd:
+            xsd_path = xml_service.generate_xsd()
+            result.xsd_generated = True
+            result.xsd_path = xsd_path
+        
+        # Generate XML
+        limit = request.limit if request.limit > 0 else None
+        xml_path = xml_service.generate_xml(limit=limit)
+        result.xml_generated = True
+        result.xml_path = xml_path
+        
+        # Validate
+        if request.validate:
+            is_valid, errors = xml_service.validate_xml()
+            result.validation_passed = is_valid
+            result.validation_errors.extend(errors)
+        
+        return result
+    
+    def _validate_xml(self, request):
+        """Blocking ORM work for ValidateXML (runs in a worker thread)"""
+        dataset = Dataset.objects.get(id=request.dataset_id)
+        xml_service = XMLService(dataset)
+        
+        is_valid, errors = xml_service.validate_xml()
+        
+        return dataset_service_pb2.ValidateXMLResponse(
+            dataset_name=dataset.name,
+            is_valid=is_valid,
+            errors=errors
+        )
+    
+    def _fetch_record_batch(self, dataset_id, after_row, batch_size):
+        """Fetch the next batch of record dicts after a row number (keyset pagination)"""
+        return list(
+            DataRecord.objects.filter(
+                dataset_id=dataset_id,
+                row_number__gt=after_row
+            ).values(
+                'id', 'row_number', 'created_at', data_json=DATA_AS_TEXT
+            ).order_by('row_number')[:batch_size]
+        )
+    
+    async def StreamDatasetRecords(self, request, context):
         """Stream dataset records in batches"""
         try:
-            dataset = Dataset.objects.get(id=request.dataset_id)
+            dataset = await run_in_thread(Dataset.objects.get)(id=request.dataset_id)
             batch_size = request.batch_size or 100
             
-            # Stream records in batches
-            offset = 0
-            total_records = dataset.total_rows
+            # Records repeat the same column names in every message, so they
+            # gzip well; only this RPC pays the compression cost
+            context.set_compression(grpc.Compression.Gzip)
             
-            while offset < total_records:
-                records = dataset.records.all().order_by('row_number')[offset:offset+batch_size]
-                
-                for record in records:
-                    yield dataset_service_pb2.DataRecord(
-                        id=record.id,
-                        dataset_id=dataset.id,
-                        row_number=record.row_number,
-                        data_json=json.dumps(record.data),
-                        created_at=record.created_at.isoformat()
-                    )
+            # One message is refilled for every record; gRPC serializes it
+            # before pulling the next item, so reuse between yields is safe
+            rec_msg = dataset_service_pb2.DataRecord()
+            
+            # Each batch resumes after the last row_number sent, served by the
+            # (dataset, row_number) index, so no OFFSET rescans and no cursor
+            # has to outlive a worker thread
+            after_row = 0
+            sent = 0
+            while True:
+                batch = await run_in_thread(self._fetch_record_batch)(
+                    dataset.id, after_row, batch_size
+                )
+                if not batch:
+                    break
                 
-                offset += batch_size
+                for record in batch:
+                    rec_msg.Clear()
+                    rec_msg.id = record['id']
+                    rec_msg.dataset_id = dataset.id
+                    rec_msg.row_number = record['row_number']
+                    rec_msg.data_json = record['data_json']
+                    rec_msg.created_at = record['created_at'].isoformat()
+                    rec_msg.created_at_unix_us = unix_us(record['created_at'])
+                    rec_msg.data.update(orjson.loads(record['data_json']))
+                    yield rec_msg
                 
+                after_row = batch[-1]['row_number']
+                sent += len(batch)
+            
+            context.set_trailing_metadata((('x-row-count', str(sent)),))
+            
         except Dataset.DoesNotExist:
             context.set_code(grpc.StatusCode.NOT_FOUND)
             context.set_details(f"Dataset with id {request.dataset_id} not found")
         except Exception as e:
-            logger.error(f"Error streaming records: {e}")
+            logger.error("Error streaming records: %s", e)
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(str(e))
 
 
-def serve(port=50052):
+async def serve(port=50052):
     """Start gRPC server"""
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    server = grpc.aio.server(options=SERVER_OPTIONS)
     dataset_service_pb2_grpc.add_DatasetServiceServicer_to_server(
         DatasetServicer(), server
     )
     
     # Bind to localhost only
     server.add_insecure_port(f'127.0.0.1:{port}')
-    server.start()
+    await server.start()
+    
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("🚀 gRPC Server started on port %s", port)
+        logger.info("   Services:")
+        logger.info("   - DatasetService (ListDatasets, GetDataset, GetDatasetRecords, GenerateXML, ValidateXML, StreamDatasetRecords)")
     
-    logger.info(f"🚀 gRPC Server started on port {port}")
-    logger.info(f"   Services:")
-    logger.info(f"   - DatasetService (ListDatasets, GetDataset, GetDatasetRecords, GenerateXML, ValidateXML, StreamDatasetRecords)")
+    # protobuf>=4.21 ships the native upb runtime; the pure-Python one is several
+    # times slower at building and serializing messages
+    protobuf_impl = api_implementation.Type()
+    logger.info("   Protobuf runtime: %s", protobuf_impl)
+    if protobuf_impl == 'python':
+        logger.warning(
+            "Pure-Python protobuf runtime in use; unset "
+            "PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION or upgrade protobuf"
+        )
     
     try:
-        server.wait_for_termination()
-    except KeyboardInterrupt:
+        await server.wait_for_termination()
+    except (KeyboardInterrupt, asyncio.CancelledError):
         logger.info("Shutting down gRPC server...")
-        server.stop(0)
+        await server.stop(0)
 
 
 if __name__ == '__main__':
-    serve()
+    asyncio.run(serve())
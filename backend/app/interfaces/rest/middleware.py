@@ -0,0 +1,20 @@
+"""
+REST API Middleware for IPVC Integration System
+"""
+
+from django.http import FileResponse
+from django.middleware.gzip import GZipMiddleware
+
+
+class ApiGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that leaves file downloads alone.
+    JSON and NDJSON responses are highly redundant and shrink several times;
+    downloaded files keep their Content-Length and sendfile, and an
+    .xml.gz file is not compressed a second time.
+    """
+
+    def process_response(self, request, response):
+        if isinstance(response, FileResponse):
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,82 @@
+"""
+REST API Pagination for IPVC Integration System
+"""
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class RecordKeysetPagination(BasePagination):
+    """
+    Keyset pagination over (dataset_id, row_number).
+
+    Clients pass ?after=<dataset_id>:<row_number> (taken from the previous
+    page's 'next' link) instead of an offset, so every page is a range read
+    on the (dataset, row_number) index no matter how deep it is.
+    """
+
+    after_query_param = 'after'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 1000
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def decode_after(self, value):
+        try:
+            dataset_id, row_number = (int(part) for part in value.split(':'))
+        except ValueError:
+            raise ValidationError({self.after_query_param: 'Expected <dataset_id>:<row_number>'})
+        return dataset_id, row_number
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        after = request.query_params.get(self.after_query_param)
+        if after:
+            dataset_id, row_number = self.decode_after(after)
+            queryset = queryset.filter(
+                Q(dataset_id__gt=dataset_id) |
+                Q(dataset_id=dataset_id, row_number__gt=row_number)
+            )
+
+        # Fetch one extra row to know whether a next page exists
+        rows = list(queryset.order_by('dataset_id', 'row_number')[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        page = rows[:page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.after_query_param,
+            f'{self.last.dataset_id}:{self.last.row_number}'
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
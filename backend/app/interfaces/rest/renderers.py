@@ -0,0 +1,42 @@
+"""
+REST API Renderers and Parsers for IPVC Integration System
+"""
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+import orjson
+
+
+class OrjsonRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson (C implementation).
+    Types orjson does not know (Decimal, lazy strings, ...) go through DRF's
+    encoder; indented output for the browsable API keeps the stock renderer.
+    """
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+
+        # Match JSONRenderer: escape U+2028/U+2029 so the output is valid JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class OrjsonParser(JSONParser):
+    """JSONParser backed by orjson"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -71,3 +71,5 @@ class XMLGenerationSerializer(serializers.Serializer):
     limit = serializers.IntegerField(required=False, min_value=1)
     generate_xsd = serializers.BooleanField(default=True)
     validate = serializers.BooleanField(default=True)
+    compress = serializers.ChoiceField(choices=['gzip'], required=False, allow_null=True)
+    force = serializers.BooleanField(default=False)
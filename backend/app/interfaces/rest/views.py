@@ -6,15 +6,22 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from django.db.models import Count, Max, TextField
+from django.db.models.functions import Cast
+from django.http import FileResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
+import hashlib
 import tempfile
+import orjson
 import os
+import shutil
 
 from app.core.models import Dataset, DatasetColumn, DataRecord, ImportLog
 from app.csv_processor.processor import CSVImporter
 from app.xml_tools.xml_service import XMLService
+from .pagination import RecordKeysetPagination
 from .serializers import (
     DatasetListSerializer, DatasetDetailSerializer,
     DatasetColumnSerializer, DataRecordSerializer,
@@ -31,19 +38,53 @@ class DatasetViewSet(viewsets.ReadOnlyModelViewSet):
     retrieve: Get a specific dataset with columns
     columns: Get columns for a dataset
     records: Get data records for a dataset
+    records_stream: Stream data records for a dataset as NDJSON
     logs: Get import logs for a dataset
     import_csv: Import a new CSV file
     generate_xml: Generate XML and XSD for a dataset
+    download_xml: Download the generated XML file
+    download_xsd: Download the generated XSD schema
     validate_xml: Validate XML against XSD
     """
     
     queryset = Dataset.objects.all()
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # ?has_xml=true lists only datasets whose XML has been generated
+        if self.action == 'list' and self.request.query_params.get('has_xml') == 'true':
+            queryset = queryset.exclude(xml_file_path__isnull=True).exclude(xml_file_path='')
+        
+        return queryset
+    
     def get_serializer_class(self):
         if self.action == 'list':
             return DatasetListSerializer
         return DatasetDetailSerializer
     
+    def list(self, request, *args, **kwargs):
+        """
+        List datasets with an ETag derived from the request (filters, page) and
+        the row count and latest updated_at of the datasets it selects,
+        answering 304 when the client's copy is still current.
+        """
+        summary = self.filter_queryset(self.get_queryset()).aggregate(
+            total=Count('id'), last_updated=Max('updated_at')
+        )
+        etag = '"%s"' % hashlib.md5(
+            f"{request.get_full_path()}:{summary['total']}:{summary['last_updated']}".encode()
+        ).hexdigest()
+        
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+        
+        response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+    
     @action(detail=True, methods=['get'])
     def columns(self, request, pk=None):
         """Get all columns for a dataset"""
@@ -61,18 +102,62 @@ class DatasetViewSet(viewsets.ReadOnlyModelViewSet):
         limit = int(request.query_params.get('limit', 100))
         offset = int(request.query_params.get('offset', 0))
         
-        # Get records
-        records = dataset.records.all().order_by('row_number')[offset:offset+limit]
+        # Get only the data column; no model instance per row
+        records = list(
+            dataset.records.order_by('row_number').values_list(
+                'data', flat=True
+            )[offset:offset+limit]
+        )
         
         return Response({
             'dataset': dataset.name,
             'total_rows': dataset.total_rows,
             'offset': offset,
             'limit': limit,
-            'count': records.count(),
-            'records': [record.data for record in records]
+            'count': len(records),
+            'records': records
         })
     
+    @action(detail=True, methods=['get'])
+    def records_stream(self, request, pk=None):
+        """
+        Stream data records for a dataset as NDJSON (one JSON object per line).
+        
+        The first line holds the metadata; every following line is one record.
+        Memory use stays constant regardless of how many records are requested.
+        
+        Optional parameters:
+        - limit: Maximum number of records (default: all)
+        - offset: Records to skip (default: 0)
+        """
+        dataset = self.get_object()
+        
+        limit = request.query_params.get('limit')
+        limit = int(limit) if limit else None
+        offset = int(request.query_params.get('offset', 0))
+        
+        # The database renders each row's JSON text, so rows are not decoded
+        # and re-encoded in Python
+        records = dataset.records.order_by('row_number').values_list(
+            Cast('data', TextField()), flat=True
+        )
+        if limit is not None:
+            records = records[offset:offset+limit]
+        elif offset:
+            records = records[offset:]
+        
+        def generate():
+            yield orjson.dumps({
+                'dataset': dataset.name,
+                'total_rows': dataset.total_rows,
+                'offset': offset,
+                'limit': limit
+            }) + b'\n'
+            for data_json in records.iterator(chunk_size=500):
+                yield data_json.encode() + b'\n'
+        
+        return StreamingHttpResponse(generate(), content_type='application/x-ndjson')
+    
     @action(detail=True, methods=['get'])
     def logs(self, request, pk=None):
         """Get import logs for a dataset"""
@@ -103,16 +188,17 @@ class DatasetViewSet(viewsets.ReadOnlyModelViewSet):
         dataset_name = serializer.validated_data.get('name') or csv_file.name.rsplit('.', 1)[0]
         description = serializer.validated_data.get('description', '')
         
-        # Save uploaded file temporarily
-        temp_dir = tempfile.mkdtemp()
-        temp_path = os.path.join(temp_dir, csv_file.name)
+        # Large uploads are already spooled to disk by Django's upload handler;
+        # only in-memory uploads need copying to a file the importer can open
+        owns_temp_file = not hasattr(csv_file, 'temporary_file_path')
+        if owns_temp_file:
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as destination:
+                shutil.copyfileobj(csv_file, destination, length=1 << 20)
+            temp_path = destination.name
+        else:
+            temp_path = csv_file.temporary_file_path()
         
         try:
-            # Write file to temp location
-            with open(temp_path, 'wb+') as destination:
-                for chunk in csv_file.chunks():
-                    destination.write(chunk)
-            
             # Import CSV
             dataset = CSVImporter.import_csv(
                 file_path=temp_path,
@@ -133,11 +219,9 @@ class DatasetViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
         finally:
-            # Cleanup temp file
-            if os.path.exists(temp_path):
+            # Cleanup temp file (Django removes its own upload files)
+            if owns_temp_file and os.path.exists(temp_path):
                 os.remove(temp_path)
-            if os.path.exists(temp_dir):
-                os.rmdir(temp_dir)
     
     @action(detail=True, methods=['post'])
     def generate_xml(self, request, pk=None):
@@ -148,6 +232,8 @@ class DatasetViewSet(viewsets.ReadOnlyModelViewSet):
         - limit: Limit number of records to export
         - generate_xsd: Generate XSD schema (default: true)
         - validate: Validate XML against XSD (default: true)
+        - compress: 'gzip' to write a compressed .xml.gz file
+        - force: Regenerate files even if their inputs are unchanged (default: false)
         """
         dataset = self.get_object()
         serializer = XMLGenerationSerializer(data=request.data)
@@ -161,6 +247,8 @@ class DatasetViewSet(viewsets.ReadOnlyModelViewSet):
         limit = serializer.validated_data.get('limit')
         generate_xsd = serializer.validated_data.get('generate_xsd', True)
         validate = serializer.validated_data.get('validate', True)
+        compress = serializer.validated_data.get('compress')
+        force = serializer.validated_data.get('force', False)
         
         try:
             xml_service = XMLService(dataset)
@@ -173,12 +261,12 @@ class DatasetViewSet(viewsets.ReadOnlyModelViewSet):
             
             # Generate XSD
             if generate_xsd:
-                xsd_path = xml_service.generate_xsd()
+                xsd_path = xml_service.generate_xsd(force=force)
                 result['xsd_path'] = xsd_path
                 result['xsd_generated'] = True
             
             # Generate XML
-            xml_path = xml_service.generate_xml(limit=limit)
+            xml_path = xml_service.generate_xml(limit=limit, compress=compress, force=force)
             result['xml_path'] = xml_path
             result['xml_generated'] = True
             
@@ -216,6 +304,40 @@ class DatasetViewSet(viewsets.ReadOnlyModelViewSet):
                 {'error': f'Validation failed: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    def _file_download(self, path, filename, content_type):
+        """Send a generated file; FileResponse lets the server use sendfile"""
+        if not path or not os.path.exists(path):
+            return Response(
+                {'error': 'File not generated yet, call generate_xml first'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=filename,
+            content_type=content_type
+        )
+    
+    @action(detail=True, methods=['get'])
+    def download_xml(self, request, pk=None):
+        """Download the generated XML file for a dataset"""
+        dataset = self.get_object()
+        if dataset.xml_file_path and dataset.xml_file_path.endswith('.gz'):
+            return self._file_download(
+                dataset.xml_file_path, f'{dataset.name}.xml.gz', 'application/gzip'
+            )
+        return self._file_download(
+            dataset.xml_file_path, f'{dataset.name}.xml', 'application/xml'
+        )
+    
+    @action(detail=True, methods=['get'])
+    def download_xsd(self, request, pk=None):
+        """Download the generated XSD schema for a dataset"""
+        dataset = self.get_object()
+        return self._file_download(
+            dataset.xml_schema_path, f'{dataset.name}.xsd', 'application/xml'
+        )
 
 
 class DataRecordViewSet(viewsets.ReadOnlyModelViewSet):
@@ -223,9 +345,11 @@ class DataRecordViewSet(viewsets.ReadOnlyModelViewSet):
     ViewSet for DataRecord operations.
     
     Allows querying individual records across all datasets.
+    Pages with ?after=<dataset_id>:<row_number> rather than an offset.
     """
     queryset = DataRecord.objects.all()
     serializer_class = DataRecordSerializer
+    pagination_class = RecordKeysetPagination
     
     def get_queryset(self):
         queryset = DataRecord.objects.all()
@@ -5,17 +5,88 @@ REST API Views for XPath/XQuery functionality
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status, viewsets
+from django.db.models import Avg, Count, FloatField, Max, Min, Sum
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast
 from django.shortcuts import get_object_or_404
 
-from app.core.models import Dataset
+from app.core.models import Dataset, DataRecord
+from app.xml_tools.xml_generator import XMLGenerator
 from app.xml_tools.xpath_query import (
     XPathQueryEngine, 
     XPathQueryExamples, 
     XPathQueryBuilder,
-    XQuerySupport
+    XQuerySupport,
+    compile_xpath
 )
 
 
+SQL_AGGREGATES = {
+    'count': Count,
+    'sum': Sum,
+    'avg': Avg,
+    'min': Min,
+    'max': Max,
+}
+
+NUMERIC_TYPES = ('integer', 'float', 'decimal')
+
+# Upper bound on the sub-queries of one /api/xpath/batch/ request
+MAX_BATCH_QUERIES = 100
+
+
+def numeric_column(dataset, field):
+    """Return the stored column name behind an XML field if it is numeric, else None"""
+    element_name = XMLGenerator.normalize_xml_name(field)
+    for column in dataset.columns_list:
+        if XMLGenerator.normalize_xml_name(column['name']) == element_name:
+            return column['name'] if column['data_type'] in NUMERIC_TYPES else None
+    return None
+
+
+def aggregate_in_database(dataset, column, operation):
+    """
+    Aggregate a numeric column over the stored records in SQL,
+    with the same empty-set results as XQuerySupport.aggregate.
+    """
+    result = DataRecord.objects.filter(dataset_id=dataset.id).annotate(
+        value=Cast(KeyTextTransform(column, 'data'), FloatField())
+    ).aggregate(result=SQL_AGGREGATES[operation]('value'))['result']
+    
+    if result is None and operation == 'avg':
+        return 0
+    return result
+
+
+def run_xpath(xpath_engine, xpath_expr, output_format):
+    """Run an XPath expression and shape the results as 'text', 'count' or 'dict'"""
+    compiled_xpath = compile_xpath(xpath_expr)
+    
+    if output_format == 'text':
+        return xpath_engine.get_element_text(compiled_xpath)
+    elif output_format == 'count':
+        return xpath_engine.count_elements(compiled_xpath)
+    else:  # dict
+        return xpath_engine.query_to_dict(compiled_xpath)
+
+
+def run_aggregate(dataset, field, operation, source, get_xquery):
+    """
+    Aggregate a field in SQL when it is a numeric column (and source is
+    'database'), otherwise from the XML file.
+    
+    Returns:
+        Tuple of (result, source actually used)
+    """
+    column = None
+    if source == 'database' and operation in SQL_AGGREGATES:
+        column = numeric_column(dataset, field)
+    
+    if column is not None:
+        return aggregate_in_database(dataset, column, operation), source
+    return get_xquery().aggregate(field, operation), 'xml'
+
+
 class XPathQueryViewSet(viewsets.ViewSet):
     """
     ViewSet for XPath/XQuery operations on datasets
@@ -60,13 +131,7 @@ class XPathQueryViewSet(viewsets.ViewSet):
         try:
             dataset = get_object_or_404(Dataset, id=dataset_id)
             xpath_engine = XPathQueryEngine(dataset)
-            
-            if output_format == 'text':
-                results = xpath_engine.get_element_text(xpath_expr)
-            elif output_format == 'count':
-                results = xpath_engine.count_elements(xpath_expr)
-            else:  # dict
-                results = xpath_engine.query_to_dict(xpath_expr)
+            results = run_xpath(xpath_engine, xpath_expr, output_format)
             
             return Response({
                 'dataset': dataset.name,
@@ -102,7 +167,8 @@ class XPathQueryViewSet(viewsets.ViewSet):
         
         try:
             dataset = get_object_or_404(Dataset, id=dataset_id)
-            xpath_engine = XPathQueryEngine(dataset)
+            # The engine only parses the XML if the stored statistics are stale
+            xpath_engine = XPathQueryEngine(dataset, load=False)
             stats = xpath_engine.get_statistics()
             
             return Response({
@@ -125,12 +191,17 @@ class XPathQueryViewSet(viewsets.ViewSet):
         {
             "dataset_id": 1,
             "field": "Area",
-            "operation": "sum"  // sum, avg, min, max, count
+            "operation": "sum",  // sum, avg, min, max, count
+            "source": "database"  // optional: "xml" to aggregate the XML file
         }
+        
+        Numeric columns are aggregated in SQL over all stored records;
+        other columns (or source "xml") are aggregated from the XML file.
         """
         dataset_id = request.data.get('dataset_id')
         field = request.data.get('field')
         operation = request.data.get('operation', 'count')
+        source = request.data.get('source', 'database')
         
         if not dataset_id or not field:
             return Response(
@@ -140,18 +211,23 @@ class XPathQueryViewSet(viewsets.ViewSet):
         
         try:
             dataset = get_object_or_404(Dataset, id=dataset_id)
-            xquery = XQuerySupport(dataset)
-            
-            field_xpath = f'//record/{field}/text()'
-            result = xquery.aggregate(field_xpath, operation)
+            result, source = run_aggregate(
+                dataset, field, operation, source, lambda: XQuerySupport(dataset)
+            )
             
             return Response({
                 'dataset': dataset.name,
                 'field': field,
                 'operation': operation,
+                'source': source,
                 'result': result
             })
             
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -194,6 +270,58 @@ class XPathQueryViewSet(viewsets.ViewSet):
                 'groups_count': len(results)
             })
             
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    @action(detail=False, methods=['post'])
+    def distinct(self, request):
+        """
+        Distinct values of a field, in document order
+        
+        POST /api/xpath/distinct/
+        {
+            "dataset_id": 1,
+            "field": "Crop"
+        }
+        
+        One pass with hash deduplication; the XPath idiom
+        //record/Crop[not(. = preceding::Crop)] is quadratic in the record count.
+        """
+        dataset_id = request.data.get('dataset_id')
+        field = request.data.get('field')
+        
+        if not dataset_id or not field:
+            return Response(
+                {'error': 'dataset_id and field are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            dataset = get_object_or_404(Dataset, id=dataset_id)
+            xquery = XQuerySupport(dataset)
+            
+            results = xquery.distinct_values(field)
+            
+            return Response({
+                'dataset': dataset.name,
+                'field': field,
+                'results': results,
+                'count': len(results)
+            })
+            
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -250,3 +378,109 @@ class XPathQueryViewSet(viewsets.ViewSet):
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Run several XPath and aggregate queries on one dataset
+        
+        POST /api/xpath/batch/
+        {
+            "dataset_id": 1,
+            "queries": [
+                {"xpath": "//record[1]", "format": "dict"},
+                {"type": "aggregate", "field": "Area", "operation": "sum"},
+                {"type": "distinct", "field": "Crop"}
+            ]
+        }
+        
+        Queries default to type "execute" and take the same fields as
+        /execute/, /aggregate/ and /distinct/. The dataset is looked up and the XML
+        loaded once for the whole batch. Results come back in query order;
+        a failing query gets an "error" entry without failing the others.
+        """
+        dataset_id = request.data.get('dataset_id')
+        queries = request.data.get('queries')
+        
+        if not dataset_id or not isinstance(queries, list) or not queries:
+            return Response(
+                {'error': 'dataset_id and a non-empty queries list are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(queries) > MAX_BATCH_QUERIES:
+            return Response(
+                {'error': f'At most {MAX_BATCH_QUERIES} queries per batch'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        dataset = get_object_or_404(Dataset, id=dataset_id)
+        
+        # Built on first use, so a batch of SQL aggregates never loads the XML
+        xquery = None
+        
+        def get_xquery():
+            nonlocal xquery
+            if xquery is None:
+                xquery = XQuerySupport(dataset)
+            return xquery
+        
+        results = []
+        for query in queries:
+            if not isinstance(query, dict):
+                results.append({'error': 'Each query must be an object'})
+                continue
+            
+            query_type = query.get('type', 'execute')
+            try:
+                if query_type == 'execute':
+                    xpath_expr = query.get('xpath')
+                    output_format = query.get('format', 'dict')
+                    if not xpath_expr:
+                        raise ValueError('xpath is required')
+                    
+                    query_results = run_xpath(get_xquery().xpath_engine, xpath_expr, output_format)
+                    results.append({
+                        'type': query_type,
+                        'xpath': xpath_expr,
+                        'format': output_format,
+                        'results': query_results,
+                        'count': len(query_results) if isinstance(query_results, list) else 1
+                    })
+                elif query_type == 'aggregate':
+                    field = query.get('field')
+                    operation = query.get('operation', 'count')
+                    if not field:
+                        raise ValueError('field is required')
+                    
+                    result, source = run_aggregate(
+                        dataset, field, operation, query.get('source', 'database'), get_xquery
+                    )
+                    results.append({
+                        'type': query_type,
+                        'field': field,
+                        'operation': operation,
+                        'source': source,
+                        'result': result
+                    })
+                elif query_type == 'distinct':
+                    field = query.get('field')
+                    if not field:
+                        raise ValueError('field is required')
+                    
+                    values = get_xquery().distinct_values(field)
+                    results.append({
+                        'type': query_type,
+                        'field': field,
+                        'results': values,
+                        'count': len(values)
+                    })
+                else:
+                    raise ValueError(f'Unknown query type: {query_type}')
+            except Exception as e:
+                results.append({'type': query_type, 'error': str(e)})
+        
+        return Response({
+            'dataset': dataset.name,
+            'results': results,
+            'count': len(results)
+        })
@@ -4,6 +4,8 @@ XML-RPC Client Test for IPVC Integration System
 
 import xmlrpc.client
 import json
+import sys
+import time
 from pprint import pprint
 
 
@@ -47,6 +49,8 @@ def run_tests():
         print("❌ No datasets found. Please import CSV files first.")
         return
     
+    sys.stdout.flush()
+    
     # Test 2: Get Dataset Detail
     print(f"\n\n🔍 TEST 2: Get Dataset Detail (ID={dataset_id})")
     print("-"*80)
@@ -72,6 +76,8 @@ def run_tests():
     except Exception as e:
         print(f"❌ Error: {e}")
     
+    sys.stdout.flush()
+    
     # Test 3: Get Dataset Statistics
     print(f"\n\n🔍 TEST 3: Get Dataset Statistics (ID={dataset_id})")
     print("-"*80)
@@ -92,6 +98,8 @@ def run_tests():
     except Exception as e:
         print(f"❌ Error: {e}")
     
+    sys.stdout.flush()
+    
     # Test 4: Get Dataset Columns
     print(f"\n\n🔍 TEST 4: Get Dataset Columns (ID={dataset_id})")
     print("-"*80)
@@ -109,6 +117,8 @@ def run_tests():
     except Exception as e:
         print(f"❌ Error: {e}")
     
+    sys.stdout.flush()
+    
     # Test 5: Get Dataset Records
     print(f"\n\n🔍 TEST 5: Get Dataset Records (ID={dataset_id}, limit=5)")
     print("-"*80)
@@ -130,14 +140,35 @@ def run_tests():
                     print(f"    {key}: {value}")
                 print()
         
+        # Next page by cursor (keyset pagination, no OFFSET scan)
+        if result['next_cursor'] is not None:
+            next_page = proxy.get_dataset_records(dataset_id, 5, 0, False, result['next_cursor'])
+            print(f"Next page starts at row {next_page['records'][0]['row_number']}")
+        
+        # Same page as a single JSON blob (compact for large pages)
+        result = proxy.get_dataset_records(dataset_id, 5, 0, True)
+        if 'error' not in result:
+            records = json.loads(result['records_json'].data)
+            print(f"Binary mode: {len(records)} records in {len(result['records_json'].data)} bytes")
+        
     except Exception as e:
         print(f"❌ Error: {e}")
     
+    sys.stdout.flush()
+    
     # Test 6: Generate XML
     print(f"\n\n🔍 TEST 6: Generate XML (ID={dataset_id}, limit=10)")
     print("-"*80)
     try:
-        result = proxy.generate_xml(dataset_id, 10, True, True)
+        task = proxy.generate_xml(dataset_id, 10, True, True)
+        print(f"Task: {task.get('task_id')} ({task.get('status')})")
+        
+        # Generation runs in the background; poll until it finishes
+        result = task
+        while 'task_id' in task and task['status'] in ('pending', 'running'):
+            time.sleep(0.5)
+            task = proxy.get_task_status(task['task_id'])
+            result = task.get('result') or task
         
         if 'error' in result:
             print(f"❌ Error: {result['error']}")
@@ -158,6 +189,8 @@ def run_tests():
     except Exception as e:
         print(f"❌ Error: {e}")
     
+    sys.stdout.flush()
+    
     # Test 7: Validate XML
     print(f"\n\n🔍 TEST 7: Validate XML (ID={dataset_id})")
     print("-"*80)
@@ -177,6 +210,8 @@ def run_tests():
     except Exception as e:
         print(f"❌ Error: {e}")
     
+    sys.stdout.flush()
+    
     # Test 8: List System Methods
     print(f"\n\n🔍 TEST 8: List Available Methods")
     print("-"*80)
@@ -190,6 +225,8 @@ def run_tests():
     except Exception as e:
         print(f"❌ Error: {e}")
     
+    sys.stdout.flush()
+    
     print("\n\n" + "="*80)
     print("✅ All XML-RPC tests completed!")
     print("="*80)
@@ -200,11 +237,15 @@ def run_tests():
     print("   • get_dataset_columns    - Get dataset column definitions")
     print("   • get_dataset_stats      - Get dataset statistics")
     print("   • generate_xml           - Generate XML and XSD for dataset")
+    print("   • get_task_status        - Poll a background XML generation task")
     print("   • validate_xml           - Validate XML against XSD")
     print("\n🌐 XML-RPC Server: http://127.0.0.1:8001/")
+    sys.stdout.flush()
 
 
 if __name__ == '__main__':
+    # Block-buffer stdout even on a terminal; run_tests flushes once per test
+    sys.stdout.reconfigure(line_buffering=False)
     try:
         run_tests()
     except ConnectionRefusedError:
@@ -4,8 +4,11 @@ XML-RPC Server Implementation for IPVC Integration System
 
 from xmlrpc.server import SimpleXMLRPCServer
 from xmlrpc.server import SimpleXMLRPCRequestHandler
+from xmlrpc.client import Binary
 import logging
+import socketserver
 import json
+import orjson
 
 # Django setup
 import os
@@ -18,8 +21,14 @@ sys.path.insert(0, backend_dir)
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 django.setup()
 
+from django.db import close_old_connections, connections
+from django.db.models import TextField
+from django.db.models.functions import Cast
+
 from app.core.models import Dataset, DatasetColumn, DataRecord
+from app.database.manager import DatabaseManager
 from app.xml_tools.xml_service import XMLService
+from app.xml_tools.tasks import generate_xml_task, get_task_status, submit_generate_xml
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -29,6 +38,66 @@ logger = logging.getLogger(__name__)
 class RequestHandler(SimpleXMLRPCRequestHandler):
     """Custom request handler"""
     rpc_paths = ('/RPC2',)
+    
+    # Gzip responses above this size for clients sending Accept-Encoding: gzip
+    # (xmlrpc.client.ServerProxy does by default)
+    encode_threshold = 1400
+    
+    # Keep connections open between calls; xmlrpc.client.Transport already
+    # reuses its connection, but an HTTP/1.0 server closes it after each response
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+
+class ThreadedRPCServer(socketserver.ThreadingMixIn, SimpleXMLRPCServer):
+    """
+    XML-RPC server handling each request in its own thread, so a long
+    generate_xml call no longer blocks every other client
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Introspection answers only change when something is registered
+        self._method_list = None
+        self._method_help = {}
+    
+    def register_function(self, *args, **kwargs):
+        self._method_list = None
+        self._method_help = {}
+        return super().register_function(*args, **kwargs)
+    
+    def register_instance(self, *args, **kwargs):
+        self._method_list = None
+        self._method_help = {}
+        return super().register_instance(*args, **kwargs)
+    
+    def system_listMethods(self):
+        if self._method_list is None:
+            self._method_list = super().system_listMethods()
+        return self._method_list
+    
+    def system_methodHelp(self, method_name):
+        if method_name not in self._method_help:
+            self._method_help[method_name] = super().system_methodHelp(method_name)
+        return self._method_help[method_name]
+    
+    def _dispatch(self, method, params):
+        try:
+            return super()._dispatch(method, params)
+        finally:
+            # Calls on a kept-alive HTTP connection share its thread's database
+            # connection until it passes CONN_MAX_AGE or goes bad
+            close_old_connections()
+    
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            # Django connections are per thread; close this thread's connection
+            # when the client disconnects instead of leaking one per client
+            connections.close_all()
 
 
 class DatasetRPCService:
@@ -47,28 +116,26 @@ class DatasetRPCService:
         Returns:
             dict: {
                 'datasets': [...],
-                'total_count': int,
+                'total_count': int (estimated on very large tables),
                 'page': int,
                 'page_size': int
             }
         """
         try:
             offset = (page - 1) * page_size
-            total_count = Dataset.objects.count()
-            datasets = Dataset.objects.all().order_by('-created_at')[offset:offset+page_size]
+            total_count = DatabaseManager.fast_count(Dataset)
             
-            dataset_list = []
-            for dataset in datasets:
-                dataset_list.append({
-                    'id': dataset.id,
-                    'name': dataset.name,
-                    'description': dataset.description or '',
-                    'total_rows': dataset.total_rows,
-                    'total_columns': dataset.total_columns,
-                    'status': dataset.status,
-                    'created_at': dataset.created_at.isoformat(),
-                    'updated_at': dataset.updated_at.isoformat()
-                })
+            # Fetch only the listed fields as dicts (no model instances)
+            dataset_list = list(
+                Dataset.objects.order_by('-created_at').values(
+                    'id', 'name', 'description', 'total_rows', 'total_columns',
+                    'status', 'created_at', 'updated_at'
+                )[offset:offset+page_size]
+            )
+            for dataset in dataset_list:
+                dataset['description'] = dataset['description'] or ''
+                dataset['created_at'] = dataset['created_at'].isoformat()
+                dataset['updated_at'] = dataset['updated_at'].isoformat()
             
             return {
                 'datasets': dataset_list,
@@ -78,7 +145,7 @@ class DatasetRPCService:
             }
             
         except Exception as e:
-            logger.error(f"Error listing datasets: {e}")
+            logger.error("Error listing datasets: %s", e)
             return {'error': str(e)}
     
     def get_dataset(self, dataset_id):
@@ -93,22 +160,15 @@ class DatasetRPCService:
         """
         try:
             dataset = Dataset.objects.get(id=dataset_id)
-            columns = dataset.columns.all().order_by('position')
             
-            column_list = []
-            for col in columns:
-                column_list.append({
-                    'id': col.id,
-                    'name': col.name,
-                    'data_type': col.data_type,
-                    'nullable': col.nullable,
-                    'unique': col.unique,
-                    'primary_key': col.primary_key,
-                    'null_count': col.null_count,
-                    'unique_count': col.unique_count,
-                    'position': col.position,
-                    'sample_values': col.sample_values or []
-                })
+            column_list = list(
+                dataset.columns.order_by('position').values(
+                    'id', 'name', 'data_type', 'nullable', 'unique', 'primary_key',
+                    'null_count', 'unique_count', 'position', 'sample_values'
+                )
+            )
+            for col in column_list:
+                col['sample_values'] = col['sample_values'] or []
             
             return {
                 'id': dataset.id,
@@ -129,10 +189,10 @@ class DatasetRPCService:
         except Dataset.DoesNotExist:
             return {'error': f'Dataset with id {dataset_id} not found'}
         except Exception as e:
-            logger.error(f"Error getting dataset: {e}")
+            logger.error("Error getting dataset: %s", e)
             return {'error': str(e)}
     
-    def get_dataset_records(self, dataset_id, limit=100, offset=0):
+    def get_dataset_records(self, dataset_id, limit=100, offset=0, as_binary=False, after_row=None):
         """
         Get dataset records with pagination
         
@@ -140,6 +200,11 @@ class DatasetRPCService:
             dataset_id: Dataset ID
             limit: Maximum records to return (default: 100)
             offset: Number of records to skip (default: 0)
+            as_binary: Return the records as one JSON base64 blob in 'records_json'
+                instead of a nested XML-RPC array (much smaller and faster to
+                marshal for large pages; default: False)
+            after_row: Return records after this row_number (keyset pagination,
+                pass the previous page's 'next_cursor'); overrides offset
             
         Returns:
             dict: {
@@ -148,87 +213,111 @@ class DatasetRPCService:
                 'offset': int,
                 'limit': int,
                 'count': int,
-                'records': [...]
+                'records': [...],
+                'next_cursor': int or None
             }
         """
         try:
             dataset = Dataset.objects.get(id=dataset_id)
-            records = dataset.records.all().order_by('row_number')[offset:offset+limit]
+            records = dataset.records.order_by('row_number')
+            if as_binary:
+                # Keep the row data as the JSON text the database already has;
+                # it is spliced into the blob without a decode/encode round trip
+                records = records.values(
+                    'id', 'row_number', 'created_at', data_json=Cast('data', TextField())
+                )
+            else:
+                records = records.values('id', 'row_number', 'data', 'created_at')
             
-            record_list = []
-            for record in records:
-                record_list.append({
-                    'id': record.id,
-                    'row_number': record.row_number,
-                    'data': record.data,
-                    'created_at': record.created_at.isoformat()
-                })
+            # Keyset pages read straight from the (dataset, row_number) index;
+            # OFFSET has to scan and discard every skipped row
+            if after_row is not None:
+                records = records.filter(row_number__gt=after_row)[:limit]
+            else:
+                records = records[offset:offset+limit]
             
-            return {
+            record_list = list(records)
+            for record in record_list:
+                record['created_at'] = record['created_at'].isoformat()
+                if as_binary:
+                    record['data'] = orjson.Fragment(record.pop('data_json'))
+            
+            result = {
                 'dataset': dataset.name,
                 'total_rows': dataset.total_rows,
                 'offset': offset,
                 'limit': limit,
                 'count': len(record_list),
-                'records': record_list
+                'next_cursor': record_list[-1]['row_number'] if record_list and len(record_list) == limit else None
             }
+            if as_binary:
+                result['records_json'] = Binary(orjson.dumps(record_list))
+            else:
+                result['records'] = record_list
+            
+            return result
             
         except Dataset.DoesNotExist:
             return {'error': f'Dataset with id {dataset_id} not found'}
         except Exception as e:
-            logger.error(f"Error getting records: {e}")
+            logger.error("Error getting records: %s", e)
             return {'error': str(e)}
     
-    def generate_xml(self, dataset_id, limit=0, generate_xsd=True, validate=True):
+    def generate_xml(self, dataset_id, limit=0, generate_xsd=True, validate=True, wait=False):
         """
         Generate XML and optionally XSD for dataset
         
+        Runs in the background by default: the call returns a task ID at once
+        and the outcome is read with get_task_status(task_id).
+        
         Args:
             dataset_id: Dataset ID
             limit: Limit number of records (0 = all)
             generate_xsd: Generate XSD schema (default: True)
             validate: Validate XML against XSD (default: True)
+            wait: Run in this request and return the result (default: False)
             
         Returns:
-            dict: Generation result with paths and validation status
+            dict: {'task_id': str, 'status': 'pending'}, or the generation
+                result with paths and validation status when wait is True
         """
         try:
-            dataset = Dataset.objects.get(id=dataset_id)
-            xml_service = XMLService(dataset)
+            if not Dataset.objects.filter(id=dataset_id).exists():
+                raise Dataset.DoesNotExist
             
-            result = {
-                'dataset_name': dataset.name,
-                'xsd_generated': False,
-                'xml_generated': False,
-                'validation_passed': None
-            }
+            if wait:
+                return generate_xml_task(dataset_id, limit, generate_xsd, validate)
             
-            # Generate XSD
-            if generate_xsd:
-                xsd_path = xml_service.generate_xsd()
-                result['xsd_generated'] = True
-                result['xsd_path'] = xsd_path
-            
-            # Generate XML
-            xml_limit = limit if limit > 0 else None
-            xml_path = xml_service.generate_xml(limit=xml_limit)
-            result['xml_generated'] = True
-            result['xml_path'] = xml_path
-            
-            # Validate
-            if validate:
-                is_valid, errors = xml_service.validate_xml()
-                result['validation_passed'] = is_valid
-                result['validation_errors'] = errors
-            
-            return result
+            task_id = submit_generate_xml(dataset_id, limit, generate_xsd, validate)
+            return {'task_id': task_id, 'status': 'pending'}
             
         except Dataset.DoesNotExist:
             return {'error': f'Dataset with id {dataset_id} not found'}
         except Exception as e:
-            logger.error(f"Error generating XML: {e}")
+            logger.error("Error generating XML: %s", e)
             return {'error': str(e)}
     
+    def get_task_status(self, task_id):
+        """
+        Get the state of a background XML generation task
+        
+        Args:
+            task_id: Task ID returned by generate_xml
+            
+        Returns:
+            dict: {
+                'task_id': str,
+                'dataset_id': int,
+                'status': 'pending' | 'running' | 'success' | 'failure',
+                'result': dict (on success),
+                'error': str (on failure)
+            }
+        """
+        task = get_task_status(task_id)
+        if task is None:
+            return {'error': f'Task {task_id} not found'}
+        return task
+    
     def validate_xml(self, dataset_id):
         """
         Validate existing XML against XSD
@@ -254,7 +343,7 @@ class DatasetRPCService:
         except Dataset.DoesNotExist:
             return {'error': f'Dataset with id {dataset_id} not found'}
         except Exception as e:
-            logger.error(f"Error validating XML: {e}")
+            logger.error("Error validating XML: %s", e)
             return {'error': str(e)}
     
     def get_dataset_columns(self, dataset_id):
@@ -268,29 +357,23 @@ class DatasetRPCService:
             list: List of column dictionaries
         """
         try:
-            dataset = Dataset.objects.get(id=dataset_id)
-            columns = dataset.columns.all().order_by('position')
-            
-            column_list = []
-            for col in columns:
-                column_list.append({
-                    'id': col.id,
-                    'name': col.name,
-                    'data_type': col.data_type,
-                    'nullable': col.nullable,
-                    'unique': col.unique,
-                    'primary_key': col.primary_key,
-                    'null_count': col.null_count,
-                    'unique_count': col.unique_count,
-                    'position': col.position
-                })
+            # Columns are read straight by dataset_id; the dataset row is only
+            # checked when there are none, to tell "no columns" from "not found"
+            column_list = list(
+                DatasetColumn.objects.filter(dataset_id=dataset_id).order_by('position').values(
+                    'id', 'name', 'data_type', 'nullable', 'unique', 'primary_key',
+                    'null_count', 'unique_count', 'position'
+                )
+            )
+            if not column_list and not Dataset.objects.filter(id=dataset_id).exists():
+                raise Dataset.DoesNotExist
             
             return column_list
             
         except Dataset.DoesNotExist:
             return {'error': f'Dataset with id {dataset_id} not found'}
         except Exception as e:
-            logger.error(f"Error getting columns: {e}")
+            logger.error("Error getting columns: %s", e)
             return {'error': str(e)}
     
     def get_dataset_stats(self, dataset_id):
@@ -320,7 +403,7 @@ class DatasetRPCService:
         except Dataset.DoesNotExist:
             return {'error': f'Dataset with id {dataset_id} not found'}
         except Exception as e:
-            logger.error(f"Error getting stats: {e}")
+            logger.error("Error getting stats: %s", e)
             return {'error': str(e)}
 
 
@@ -328,10 +411,11 @@ def serve(host='127.0.0.1', port=8001):
     """Start XML-RPC server"""
     
     # Create server
-    server = SimpleXMLRPCServer(
+    server = ThreadedRPCServer(
         (host, port),
         requestHandler=RequestHandler,
-        allow_none=True
+        allow_none=True,
+        use_builtin_types=True
     )
     
     server.register_introspection_functions()
@@ -340,15 +424,17 @@ def serve(host='127.0.0.1', port=8001):
     service = DatasetRPCService()
     server.register_instance(service)
     
-    logger.info(f"🚀 XML-RPC Server started on {host}:{port}")
-    logger.info(f"   Methods:")
-    logger.info(f"   - list_datasets(page, page_size)")
-    logger.info(f"   - get_dataset(dataset_id)")
-    logger.info(f"   - get_dataset_records(dataset_id, limit, offset)")
-    logger.info(f"   - get_dataset_columns(dataset_id)")
-    logger.info(f"   - get_dataset_stats(dataset_id)")
-    logger.info(f"   - generate_xml(dataset_id, limit, generate_xsd, validate)")
-    logger.info(f"   - validate_xml(dataset_id)")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("🚀 XML-RPC Server started on %s:%s", host, port)
+        logger.info("   Methods:")
+        logger.info("   - list_datasets(page, page_size)")
+        logger.info("   - get_dataset(dataset_id)")
+        logger.info("   - get_dataset_records(dataset_id, limit, offset, as_binary, after_row)")
+        logger.info("   - get_dataset_columns(dataset_id)")
+        logger.info("   - get_dataset_stats(dataset_id)")
+        logger.info("   - generate_xml(dataset_id, limit, generate_xsd, validate, wait)")
+        logger.info("   - get_task_status(task_id)")
+        logger.info("   - validate_xml(dataset_id)")
     
     try:
         server.serve_forever()
@@ -6,20 +6,32 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv(Path(__file__).resolve().parent.parent.parent / '.env')
+# Load environment variables from .env file; child processes (autoreloader,
+# forked workers) inherit the result, so the file is parsed once
+if not os.environ.get('IPVC_DOTENV_LOADED'):
+    load_dotenv(Path(__file__).resolve().parent.parent.parent / '.env')
+    os.environ['IPVC_DOTENV_LOADED'] = '1'
+
+# Settings read one snapshot of the environment
+_ENV = dict(os.environ)
+
+
+def env(key, default=None):
+    """Read a setting from the environment snapshot"""
+    return _ENV.get(key, default)
+
 
 # Build paths inside the project
 BASE_DIR = Path(__file__).resolve().parent.parent
 PROJECT_ROOT = BASE_DIR.parent
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', 'django-insecure-dev-key-change-in-production')
+SECRET_KEY = env('DJANGO_SECRET_KEY', 'django-insecure-dev-key-change-in-production')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = os.getenv('DEBUG', 'True') == 'True'
+DEBUG = env('DEBUG', 'True') == 'True'
 
-ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+ALLOWED_HOSTS = env('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
 # Application definition
 INSTALLED_APPS = [
@@ -48,9 +60,14 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'app.interfaces.rest.renderers.OrjsonRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
+    'DEFAULT_PARSER_CLASSES': [
+        'app.interfaces.rest.renderers.OrjsonParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # Change in production
     ],
@@ -58,6 +75,7 @@ REST_FRAMEWORK = {
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'app.interfaces.rest.middleware.ApiGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -88,31 +106,36 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 # Database
 # Supports PostgreSQL and MySQL - configure via environment variables
-DATABASE_ENGINE = os.getenv('DB_ENGINE', 'postgresql')  # postgresql or mysql
+DATABASE_ENGINE = env('DB_ENGINE', 'postgresql')  # postgresql or mysql
 
 if DATABASE_ENGINE == 'postgresql':
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.postgresql',
-            'NAME': os.getenv('POSTGRES_DB', 'ipvc_integration_db'),
-            'USER': os.getenv('POSTGRES_USER', 'postgres'),
-            'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'postgres'),
-            'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
-            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            'NAME': env('POSTGRES_DB', 'ipvc_integration_db'),
+            'USER': env('POSTGRES_USER', 'postgres'),
+            'PASSWORD': env('POSTGRES_PASSWORD', 'postgres'),
+            'HOST': env('POSTGRES_HOST', 'localhost'),
+            'PORT': env('POSTGRES_PORT', '5432'),
+            # Keep connections open between requests (0 = close after each one)
+            'CONN_MAX_AGE': int(env('DB_CONN_MAX_AGE', '600')),
+            'CONN_HEALTH_CHECKS': True,
         }
     }
 elif DATABASE_ENGINE == 'mysql':
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.mysql',
-            'NAME': os.getenv('MYSQL_DATABASE', 'ipvc_integration_db'),
-            'USER': os.getenv('MYSQL_USER', 'root'),
-            'PASSWORD': os.getenv('MYSQL_PASSWORD', 'mysql'),
-            'HOST': os.getenv('MYSQL_HOST', 'localhost'),
-            'PORT': os.getenv('MYSQL_PORT', '3306'),
-            'OPTIONS': {
-                'init_command': "SET sql_mode='STRICT_TRANS_TABLES'"
-            }
+            'NAME': env('MYSQL_DATABASE', 'ipvc_integration_db'),
+            'USER': env('MYSQL_USER', 'root'),
+            'PASSWORD': env('MYSQL_PASSWORD', 'mysql'),
+            'HOST': env('MYSQL_HOST', 'localhost'),
+            'PORT': env('MYSQL_PORT', '3306'),
+            'CONN_MAX_AGE': int(env('DB_CONN_MAX_AGE', '600')),
+            'CONN_HEALTH_CHECKS': True,
+            # sql_mode is left to the server ([mysqld] sql_mode, which includes
+            # STRICT_TRANS_TABLES by default on MySQL 8) instead of an
+            # init_command round trip on every new connection
         }
     }
 else:
@@ -153,7 +176,4 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 DATA_DIR = PROJECT_ROOT / 'data'
 XML_SCHEMA_DIR = PROJECT_ROOT / 'schemas'
 XML_OUTPUT_DIR = PROJECT_ROOT / 'xml_output'
-
-# Create directories if they don't exist
-XML_SCHEMA_DIR.mkdir(exist_ok=True)
-XML_OUTPUT_DIR.mkdir(exist_ok=True)
+# XML_SCHEMA_DIR and XML_OUTPUT_DIR are created by XmlToolsConfig.ready()
@@ -5,3 +5,10 @@ class XmlToolsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app.xml_tools'
     verbose_name = 'XML Tools'
+    
+    def ready(self):
+        from django.conf import settings
+        
+        # Create output directories once the app registry is ready
+        settings.XML_SCHEMA_DIR.mkdir(parents=True, exist_ok=True)
+        settings.XML_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
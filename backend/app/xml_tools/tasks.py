@@ -0,0 +1,146 @@
+"""
+Background XML generation jobs
+
+Generating the XML of a large dataset can take minutes, so RPC callers
+submit a job and poll its state instead of holding the connection open.
+Jobs run on a small thread pool inside the server process.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from django.db import close_old_connections, connections
+from app.core.models import Dataset
+from app.xml_tools.xml_service import XMLService
+import logging
+import threading
+import uuid
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Job states reported by get_task_status()
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCESS = 'success'
+FAILURE = 'failure'
+
+MAX_WORKERS = 2
+# Finished jobs kept around for polling; the oldest are forgotten first
+MAX_TASKS = 100
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='xml-task')
+_tasks: "OrderedDict[str, dict]" = OrderedDict()
+_tasks_lock = threading.Lock()
+
+
+def _set_status(dataset: Dataset, status: str) -> None:
+    """Save only the status so a concurrent save of other fields is not overwritten"""
+    dataset.status = status
+    dataset.save(update_fields=['status', 'updated_at'])
+
+
+def generate_xml_task(dataset_id: int, limit: int = 0, generate_xsd: bool = True,
+                      validate: bool = True) -> dict:
+    """
+    Generate XSD, XML and optionally validate a dataset.
+
+    Args:
+        dataset_id: Dataset ID
+        limit: Limit number of records (0 = all)
+        generate_xsd: Generate XSD schema
+        validate: Validate XML against XSD
+
+    Returns:
+        dict: Generation result with paths and validation status
+    """
+    dataset = Dataset.objects.get(id=dataset_id)
+    xml_service = XMLService(dataset)
+
+    result = {
+        'dataset_name': dataset.name,
+        'xsd_generated': False,
+        'xml_generated': False,
+        'validation_passed': None
+    }
+
+    # Dataset.status is the import state: it shows 'processing' while the job
+    # runs and is then restored; the job outcome is recorded in _tasks
+    previous_status = dataset.status
+    _set_status(dataset, 'processing')
+    try:
+        with xml_service.batch():
+            # Generate XSD
+            if generate_xsd:
+                xsd_path = xml_service.generate_xsd()
+                result['xsd_generated'] = True
+                result['xsd_path'] = xsd_path
+
+            # Generate XML
+            xml_limit = limit if limit > 0 else None
+            xml_path = xml_service.generate_xml(limit=xml_limit)
+            result['xml_generated'] = True
+            result['xml_path'] = xml_path
+
+            # Validate
+            if validate:
+                is_valid, errors = xml_service.validate_xml()
+                result['validation_passed'] = is_valid
+                result['validation_errors'] = errors
+    finally:
+        _set_status(dataset, previous_status)
+
+    return result
+
+
+def _run(task_id: str, args: tuple) -> None:
+    """Worker body: run the job and record its outcome"""
+    with _tasks_lock:
+        _tasks[task_id]['status'] = RUNNING
+
+    close_old_connections()
+    try:
+        result = generate_xml_task(*args)
+        outcome = {'status': SUCCESS, 'result': result}
+    except Exception as e:
+        logger.error("XML task %s failed: %s", task_id, e)
+        outcome = {'status': FAILURE, 'error': str(e)}
+    finally:
+        # Worker threads are reused; do not leave their connections open
+        connections.close_all()
+
+    with _tasks_lock:
+        _tasks[task_id].update(outcome)
+
+
+def submit_generate_xml(dataset_id: int, limit: int = 0, generate_xsd: bool = True,
+                        validate: bool = True) -> str:
+    """
+    Queue an XML generation job.
+
+    Returns:
+        str: Task ID to pass to get_task_status()
+    """
+    task_id = uuid.uuid4().hex
+
+    with _tasks_lock:
+        _tasks[task_id] = {'task_id': task_id, 'dataset_id': dataset_id, 'status': PENDING}
+        while len(_tasks) > MAX_TASKS:
+            oldest = next(iter(_tasks))
+            if _tasks[oldest]['status'] in (PENDING, RUNNING):
+                break
+            del _tasks[oldest]
+
+    _executor.submit(_run, task_id, (dataset_id, limit, generate_xsd, validate))
+    return task_id
+
+
+def get_task_status(task_id: str) -> Optional[dict]:
+    """
+    Current state of a job ('pending', 'running', 'success' or 'failure'),
+    with its 'result' on success or 'error' on failure; None if unknown.
+    """
+    with _tasks_lock:
+        task = _tasks.get(task_id)
+        if task is None:
+            return None
+        return dict(task)
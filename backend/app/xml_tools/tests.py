@@ -0,0 +1,49 @@
+"""
+Tests for the XPath query engine
+"""
+
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from app.core.models import Dataset
+from app.interfaces.rest.xpath_views import run_xpath
+from app.xml_tools import xpath_query
+from app.xml_tools.xpath_query import XPathQueryEngine
+
+XML = b"""<?xml version='1.0' encoding='UTF-8'?>
+<sales>
+  <record><product>Milk</product><category>Dairy</category></record>
+  <record><product>Bread</product><category>Bakery</category></record>
+  <record><product>Cheese</product><category>Dairy</category></record>
+</sales>
+"""
+
+
+class StreamingQueryTests(SimpleTestCase):
+    """Record queries on large files are streamed, never parsed into a full tree"""
+
+    def setUp(self):
+        handle, self.xml_path = tempfile.mkstemp(suffix='.xml')
+        with os.fdopen(handle, 'wb') as f:
+            f.write(XML)
+        self.addCleanup(os.remove, self.xml_path)
+
+        # Every file counts as large
+        patcher = mock.patch.object(xpath_query, 'STREAMING_THRESHOLD', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.engine = XPathQueryEngine(Dataset(name='sales', xml_file_path=self.xml_path))
+
+    def test_precompiled_record_query_streams(self):
+        """run_xpath compiles the expression before calling the engine"""
+        with mock.patch.object(XPathQueryEngine, 'load_xml') as load_xml:
+            count = run_xpath(self.engine, '//record[category="Dairy"]', 'count')
+            records = run_xpath(self.engine, '//record[category="Dairy"]', 'dict')
+
+        load_xml.assert_not_called()
+        self.assertEqual(count, 2)
+        self.assertEqual([record['product'] for record in records], ['Milk', 'Cheese'])
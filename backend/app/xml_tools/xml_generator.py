@@ -4,29 +4,54 @@ XML Generator - Converts dataset records to XML format
 
 from lxml import etree
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any, Optional
+import gzip
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+# Characters not allowed in generated element names
+XML_INVALID_CHARS = re.compile(r'[^\w]')
+# Same replacement for ASCII names, as a str.translate table
+XML_INVALID_ASCII = {
+    code: '_' for code in range(128)
+    if not (chr(code).isalnum() or chr(code) == '_')
+}
+
+XSI_NAMESPACE = 'http://www.w3.org/2001/XMLSchema-instance'
+XSI_NIL = etree.QName(XSI_NAMESPACE, 'nil')
+# Bound on the root, so nil attributes do not each declare the namespace
+XSI_NSMAP = {'xsi': XSI_NAMESPACE}
+
+# Supported output compressions and their file suffix; libxml2 reads gzip
+# files transparently, so compressed exports stay queryable
+COMPRESSION_SUFFIXES = {
+    None: '',
+    'gzip': '.gz',
+}
+
 
 class XMLGenerator:
     """
     Generates XML files from dataset records.
     """
     
-    def __init__(self, dataset_name: str, columns: List[str], records: List[Dict[str, Any]]):
+    def __init__(self, dataset_name: str, columns: List[str], records: Iterable[Dict[str, Any]]):
         """
         Initialize XML Generator.
         
         Args:
             dataset_name: Name of the dataset (root element name)
             columns: List of column names
-            records: List of record dictionaries
+            records: Iterable of record dictionaries (consumed once)
         """
         self.dataset_name = dataset_name
         self.columns = columns
         self.records = records
+        
+        # Element names depend only on the columns; normalize them once
+        self.xml_names = [self.normalize_xml_name(column) for column in columns]
     
     @staticmethod
     def normalize_xml_name(name: str) -> str:
@@ -42,10 +67,15 @@ class XMLGenerator:
         Returns:
             str: Valid XML element name
         """
-        import re
+        # Most column names are already valid; ASCII identifiers need no change
+        if name.isascii() and name.isidentifier():
+            return name
         
         # Replace spaces and special chars with underscore
-        normalized = re.sub(r'[^\w]', '_', name)
+        if name.isascii():
+            normalized = name.translate(XML_INVALID_ASCII)
+        else:
+            normalized = XML_INVALID_CHARS.sub('_', name)
         
         # Ensure it starts with letter or underscore
         if normalized and not normalized[0].isalpha() and normalized[0] != '_':
@@ -53,68 +83,99 @@ class XMLGenerator:
         
         return normalized
     
+    def build_record(self, record: Dict[str, Any]) -> etree.Element:
+        """
+        Build the <record> element for a single record.
+        
+        Args:
+            record: Record dictionary
+            
+        Returns:
+            lxml.etree.Element: The record element
+        """
+        values = list(map(record.get, self.columns))
+        
+        # save_xml writes each record on its own, without the root's binding,
+        # so a record with nulls declares xsi once instead of on every nil column
+        record_element = etree.Element("record", nsmap=XSI_NSMAP if None in values else None)
+        
+        # Add each column value
+        for xml_column_name, value in zip(self.xml_names, values):
+            # Create column element
+            col_element = etree.SubElement(record_element, xml_column_name)
+            
+            # Set text value (handle None/null values)
+            if value is not None:
+                col_element.text = str(value)
+            else:
+                # For null values, use xsi:nil attribute
+                col_element.set(XSI_NIL, "true")
+        
+        return record_element
+    
     def generate_xml(self) -> etree.Element:
         """
         Generate XML document as lxml Element.
+        Builds the whole tree in memory; save_xml streams instead.
         
         Returns:
             lxml.etree.Element: The complete XML document
         """
         # Create root element
-        root = etree.Element(self.dataset_name)
+        root = etree.Element(self.dataset_name, nsmap=XSI_NSMAP)
         
         # Add each record
         for record in self.records:
-            record_element = etree.SubElement(root, "record")
-            
-            # Add each column value
-            for column in self.columns:
-                value = record.get(column)
-                
-                # Normalize column name for XML
-                xml_column_name = self.normalize_xml_name(column)
-                
-                # Create column element
-                col_element = etree.SubElement(record_element, xml_column_name)
-                
-                # Set text value (handle None/null values)
-                if value is not None:
-                    col_element.text = str(value)
-                else:
-                    # For null values, use xsi:nil attribute
-                    col_element.set(
-                        "{http://www.w3.org/2001/XMLSchema-instance}nil",
-                        "true"
-                    )
+            root.append(self.build_record(record))
         
         return root
     
-    def save_xml(self, output_path: str) -> str:
+    def save_xml(self, output_path: str, compress: Optional[str] = None,
+                 pretty: bool = False) -> str:
         """
         Generate and save XML to file.
+        Records are written one at a time, so memory use does not grow with
+        the dataset size.
         
         Args:
             output_path: Path where XML file will be saved
+            compress: None for plain XML or 'gzip' to compress while writing
+            pretty: Indent records like pretty_print output (larger, slower)
             
         Returns:
             str: Path to saved XML file
         """
-        root = self.generate_xml()
+        if compress not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unsupported compression: {compress}")
         
         # Create directory if it doesn't exist
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Write XML to file with pretty formatting
-        tree = etree.ElementTree(root)
-        tree.write(
-            str(output_path),
-            pretty_print=True,
-            xml_declaration=True,
-            encoding='utf-8'
-        )
-        
-        logger.info(f"XML saved to {output_path}")
+        if compress == 'gzip':
+            # Level 6 is most of level 9's ratio at a fraction of the CPU
+            output_file = gzip.open(output_path, 'wb', compresslevel=6)
+        else:
+            output_file = open(output_path, 'wb')
+        
+        # Write XML incrementally; compact unless pretty output is requested
+        with output_file:
+            with etree.xmlfile(output_file, encoding='UTF-8') as xf:
+                xf.write_declaration()
+                with xf.element(self.dataset_name, nsmap=XSI_NSMAP):
+                    has_records = False
+                    for record in self.records:
+                        record_element = self.build_record(record)
+                        if pretty:
+                            etree.indent(record_element, space='  ', level=1)
+                            xf.write('\n  ')
+                        xf.write(record_element)
+                        has_records = True
+                    if pretty and has_records:
+                        xf.write('\n')
+            output_file.write(b'\n')
+        
+        logger.info("XML saved to %s", output_path)
         return str(output_path)
     
     @staticmethod
@@ -130,14 +191,14 @@ class XMLGenerator:
             XMLGenerator instance
         """
         # Get columns in order
-        columns = [col.name for col in dataset.columns.all().order_by('position')]
+        columns = [col['name'] for col in dataset.columns_list]
         
         # Get records
         records_qs = dataset.records.all().order_by('row_number')
         if limit:
             records_qs = records_qs[:limit]
         
-        # Extract data from records
-        records = [record.data for record in records_qs]
+        # Stream only the data column; rows are fetched lazily while writing
+        records = records_qs.values_list('data', flat=True).iterator(chunk_size=2000)
         
         return XMLGenerator(dataset.name, columns, records)
@@ -2,12 +2,19 @@
 XML Service - Orchestrates XML/XSD generation and validation
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import cached_property
 from pathlib import Path
 from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Max
 from app.xml_tools.xsd_generator import XSDGenerator
-from app.xml_tools.xml_generator import XMLGenerator
+from app.xml_tools.xml_generator import XMLGenerator, COMPRESSION_SUFFIXES
 from app.xml_tools.xml_validator import XMLValidator
+from app.xml_tools.xpath_query import invalidate_tree
 from app.core.models import Dataset, ImportLog
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,94 +35,220 @@ class XMLService:
         self.dataset = dataset
         self.xml_output_dir = settings.XML_OUTPUT_DIR
         self.xsd_output_dir = settings.XML_SCHEMA_DIR
+        
+        # Inside batch(), log entries and dataset field updates are collected
+        # and written once when the block exits
+        self._batching = False
+        self._pending_logs = []
+        self._pending_fields = set()
+    
+    def _log(self, level: str, message: str, details: dict = None):
+        """Record an ImportLog entry for the dataset (deferred inside batch())."""
+        entry = ImportLog(dataset=self.dataset, level=level, message=message, details=details or {})
+        if self._batching:
+            self._pending_logs.append(entry)
+        else:
+            entry.save()
+    
+    def _save_dataset(self, *fields: str):
+        """Save only the given dataset fields (deferred inside batch())."""
+        if self._batching:
+            self._pending_fields.update(fields)
+        else:
+            self.dataset.save(update_fields=[*fields, 'updated_at'])
+    
+    def flush(self):
+        """Write pending dataset updates and log entries."""
+        if self._pending_fields:
+            self.dataset.save(update_fields=[*self._pending_fields, 'updated_at'])
+            self._pending_fields.clear()
+        if self._pending_logs:
+            ImportLog.objects.bulk_create(self._pending_logs)
+            self._pending_logs.clear()
+    
+    def _generate_xsd_in_thread(self, force: bool = False) -> str:
+        """generate_xsd() for a worker thread, closing the thread's connection."""
+        try:
+            return self.generate_xsd(force=force)
+        finally:
+            connections.close_all()
+    
+    @contextmanager
+    def batch(self):
+        """
+        Group the writes of several steps: one dataset save and one
+        bulk insert of log entries when the block exits (even on error).
+        """
+        self._batching = True
+        try:
+            yield self
+        finally:
+            self._batching = False
+            self.flush()
     
     def get_xsd_path(self) -> Path:
         """Get path for XSD file."""
         return self.xsd_output_dir / f"{self.dataset.name}.xsd"
     
-    def get_xml_path(self) -> Path:
+    @cached_property
+    def _validator(self) -> XMLValidator:
+        """Validator for the dataset's XSD, reused until the XSD is regenerated."""
+        return XMLValidator(str(self.get_xsd_path()))
+    
+    def get_xml_path(self, compress: str = None) -> Path:
         """Get path for XML file."""
-        return self.xml_output_dir / f"{self.dataset.name}.xml"
+        suffix = COMPRESSION_SUFFIXES.get(compress, '')
+        return self.xml_output_dir / f"{self.dataset.name}.xml{suffix}"
+    
+    @staticmethod
+    def _fingerprint(*parts) -> str:
+        """Short hash of the inputs a generated file depends on."""
+        return hashlib.blake2b('|'.join(map(str, parts)).encode(), digest_size=16).hexdigest()
     
-    def generate_xsd(self) -> str:
+    def get_xsd_fingerprint(self) -> str:
+        """Fingerprint of the XSD inputs: dataset name and column layout."""
+        return self._fingerprint(self.dataset.name, self.dataset.columns_list)
+    
+    def get_xml_fingerprint(self, limit: int = None, compress: str = None,
+                            pretty: bool = False) -> str:
+        """
+        Fingerprint of the XML inputs: the XSD inputs, the record count and
+        last record update, and the output options.
+        """
+        records = self.dataset.records.aggregate(count=Count('id'), last_update=Max('updated_at'))
+        return self._fingerprint(
+            self.dataset.name, self.dataset.columns_list,
+            records['count'], records['last_update'],
+            limit or None, compress, pretty
+        )
+    
+    def _is_up_to_date(self, path: Path, stored_path: str,
+                       stored_fingerprint: str, fingerprint: str) -> bool:
+        """Whether the file at path was generated from the same inputs."""
+        return stored_fingerprint == fingerprint and stored_path == str(path) and path.exists()
+    
+    def generate_xsd(self, force: bool = False) -> str:
         """
         Generate XSD schema for the dataset.
         
+        Args:
+            force: Regenerate even if the existing XSD is up to date
+            
         Returns:
             str: Path to generated XSD file
         """
-        logger.info(f"Generating XSD for dataset '{self.dataset.name}'")
+        logger.info("Generating XSD for dataset '%s'", self.dataset.name)
         
         try:
+            fingerprint = self.get_xsd_fingerprint()
+            xsd_path = self.get_xsd_path()
+            if not force and self._is_up_to_date(
+                xsd_path, self.dataset.xml_schema_path,
+                self.dataset.xsd_fingerprint, fingerprint
+            ):
+                self._log(
+                    level='info',
+                    message="XSD schema unchanged, generation skipped",
+                    details={'xsd_path': str(xsd_path)}
+                )
+                logger.info("✓ XSD up to date: %s", xsd_path)
+                return str(xsd_path)
+            
             # Create XSD generator
             xsd_gen = XSDGenerator.from_dataset(self.dataset)
             
             # Generate and save XSD
-            xsd_path = xsd_gen.save_xsd(str(self.get_xsd_path()))
+            xsd_path = xsd_gen.save_xsd(str(xsd_path))
             
             # Update dataset with XSD path
             self.dataset.xml_schema_path = xsd_path
-            self.dataset.save()
+            self.dataset.xsd_fingerprint = fingerprint
+            self._save_dataset('xml_schema_path', 'xsd_fingerprint')
+            
+            # Compile the new schema on the next validation
+            self.__dict__.pop('_validator', None)
             
             # Log success
-            ImportLog.objects.create(
-                dataset=self.dataset,
+            self._log(
                 level='success',
                 message=f"XSD schema generated successfully",
                 details={'xsd_path': xsd_path}
             )
             
-            logger.info(f"✓ XSD generated: {xsd_path}")
+            logger.info("✓ XSD generated: %s", xsd_path)
             return xsd_path
             
         except Exception as e:
-            logger.error(f"✗ XSD generation failed: {e}")
-            ImportLog.objects.create(
-                dataset=self.dataset,
+            logger.error("✗ XSD generation failed: %s", e)
+            self._log(
                 level='error',
                 message=f"XSD generation failed: {str(e)}"
             )
             raise
     
-    def generate_xml(self, limit: int = None) -> str:
+    def generate_xml(self, limit: int = None, compress: str = None,
+                     pretty: bool = False, force: bool = False) -> str:
         """
         Generate XML file from dataset records.
         
         Args:
             limit: Optional limit on number of records to export
+            compress: Optional output compression ('gzip')
+            pretty: Write indented XML instead of compact output
+            force: Regenerate even if the existing XML is up to date
             
         Returns:
             str: Path to generated XML file
         """
-        logger.info(f"Generating XML for dataset '{self.dataset.name}'")
+        logger.info("Generating XML for dataset '%s'", self.dataset.name)
         
         try:
+            fingerprint = self.get_xml_fingerprint(limit, compress, pretty)
+            xml_path = self.get_xml_path(compress)
+            if not force and self._is_up_to_date(
+                xml_path, self.dataset.xml_file_path,
+                self.dataset.xml_fingerprint, fingerprint
+            ):
+                self._log(
+                    level='info',
+                    message="XML unchanged, generation skipped",
+                    details={'xml_path': str(xml_path)}
+                )
+                logger.info("✓ XML up to date: %s", xml_path)
+                return str(xml_path)
+            
             # Create XML generator
             xml_gen = XMLGenerator.from_dataset(self.dataset, limit=limit)
             
             # Generate and save XML
-            xml_path = xml_gen.save_xml(str(self.get_xml_path()))
+            xml_path = xml_gen.save_xml(str(xml_path), compress=compress, pretty=pretty)
             
-            # Update dataset with XML path
+            # Update dataset with XML path and drop statistics of the old file
             self.dataset.xml_file_path = xml_path
-            self.dataset.save()
+            self.dataset.xml_fingerprint = fingerprint
+            self.dataset.stats_cache = {}
+            self.dataset.stats_cache_version = 0
+            self._save_dataset(
+                'xml_file_path', 'xml_fingerprint', 'stats_cache', 'stats_cache_version'
+            )
+            
+            # Release the previously parsed tree used by XPath queries
+            invalidate_tree(self.dataset.id)
             
             # Log success
             record_count = limit if limit else self.dataset.total_rows
-            ImportLog.objects.create(
-                dataset=self.dataset,
+            self._log(
                 level='success',
                 message=f"XML generated successfully with {record_count} records",
                 details={'xml_path': xml_path}
             )
             
-            logger.info(f"✓ XML generated: {xml_path}")
+            logger.info("✓ XML generated: %s", xml_path)
             return xml_path
             
         except Exception as e:
-            logger.error(f"✗ XML generation failed: {e}")
-            ImportLog.objects.create(
-                dataset=self.dataset,
+            logger.error("✗ XML generation failed: %s", e)
+            self._log(
                 level='error',
                 message=f"XML generation failed: {str(e)}"
             )
@@ -128,10 +261,14 @@ class XMLService:
         Returns:
             tuple: (is_valid, errors)
         """
-        logger.info(f"Validating XML for dataset '{self.dataset.name}'")
+        logger.info("Validating XML for dataset '%s'", self.dataset.name)
         
         xsd_path = self.get_xsd_path()
-        xml_path = self.get_xml_path()
+        # The last generated file, which may be compressed
+        if self.dataset.xml_file_path:
+            xml_path = Path(self.dataset.xml_file_path)
+        else:
+            xml_path = self.get_xml_path()
         
         # Check if files exist
         if not xsd_path.exists():
@@ -145,52 +282,50 @@ class XMLService:
             return False, [error_msg]
         
         try:
-            # Create validator
-            validator = XMLValidator(str(xsd_path))
-            
             # Validate
-            is_valid, errors = validator.validate(str(xml_path))
+            is_valid, errors = self._validator.validate(str(xml_path))
             
             # Log result
             if is_valid:
-                ImportLog.objects.create(
-                    dataset=self.dataset,
+                self._log(
                     level='success',
                     message="XML validation successful"
                 )
                 logger.info("✓ XML is valid")
             else:
-                ImportLog.objects.create(
-                    dataset=self.dataset,
+                self._log(
                     level='error',
                     message=f"XML validation failed",
                     details={'errors': errors}
                 )
-                logger.error(f"✗ XML validation failed: {errors}")
+                logger.error("✗ XML validation failed: %s", errors)
             
             return is_valid, errors
             
         except Exception as e:
             error_msg = f"Validation error: {str(e)}"
             logger.error(error_msg)
-            ImportLog.objects.create(
-                dataset=self.dataset,
+            self._log(
                 level='error',
                 message=error_msg
             )
             return False, [error_msg]
     
-    def generate_and_validate(self, limit: int = None) -> dict:
+    def generate_and_validate(self, limit: int = None, compress: str = None,
+                              force: bool = False) -> dict:
         """
         Complete workflow: Generate XSD, generate XML, and validate.
+        Files generated from unchanged inputs are reused unless force is set.
         
         Args:
             limit: Optional limit on number of records to export
+            compress: Optional output compression ('gzip')
+            force: Regenerate the XSD and XML even if they are up to date
             
         Returns:
             dict: Summary of the process
         """
-        logger.info(f"Starting complete XML workflow for '{self.dataset.name}'")
+        logger.info("Starting complete XML workflow for '%s'", self.dataset.name)
         
         result = {
             'dataset': self.dataset.name,
@@ -201,26 +336,29 @@ class XMLService:
         }
         
         try:
-            # Step 1: Generate XSD
-            xsd_path = self.generate_xsd()
-            result['xsd_path'] = xsd_path
-            result['xsd_generated'] = True
-            
-            # Step 2: Generate XML
-            xml_path = self.generate_xml(limit=limit)
-            result['xml_path'] = xml_path
-            result['xml_generated'] = True
-            
-            # Step 3: Validate
-            is_valid, errors = self.validate_xml()
-            result['validation_passed'] = is_valid
-            result['validation_errors'] = errors
+            # Write the dataset and the step logs once, at the end
+            with self.batch(), ThreadPoolExecutor(max_workers=1) as executor:
+                # Steps 1 and 2: the XSD only needs the column metadata, so it
+                # is written in the background while the records are streamed
+                xsd_future = executor.submit(self._generate_xsd_in_thread, force)
+                xml_path = self.generate_xml(limit=limit, compress=compress, force=force)
+                xsd_path = xsd_future.result()
+                
+                result['xsd_path'] = xsd_path
+                result['xsd_generated'] = True
+                result['xml_path'] = xml_path
+                result['xml_generated'] = True
+                
+                # Step 3: Validate
+                is_valid, errors = self.validate_xml()
+                result['validation_passed'] = is_valid
+                result['validation_errors'] = errors
             
             logger.info("✓ Complete XML workflow finished successfully")
             
         except Exception as e:
             error_msg = f"Workflow failed: {str(e)}"
             result['errors'].append(error_msg)
-            logger.error(f"✗ {error_msg}")
+            logger.error("✗ %s", error_msg)
         
         return result
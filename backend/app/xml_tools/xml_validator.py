@@ -3,19 +3,47 @@ XML Validator - Validates XML files against XSD schemas
 """
 
 from lxml import etree
-import xmlschema
+from functools import lru_cache
+from io import BytesIO
+import gzip
 from pathlib import Path
-from typing import Tuple, List, Dict
+from typing import Any, Tuple, List, Dict
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=32)
+def _compile_schema(xsd_path: str, mtime_ns: int) -> Tuple[Any, threading.Lock]:
+    """
+    Compile an XSD once per (path, modification time).
+    
+    Compilation dominates the cost of validating small documents; a regenerated
+    XSD gets a new mtime and therefore a fresh entry. The lock serializes use of
+    the shared schema, whose error_log is per instance.
+    
+    Schemas libxml2 cannot compile (e.g. XSD 1.1 features) fall back to the
+    much slower pure-Python xmlschema package, imported only then.
+    """
+    try:
+        schema = etree.XMLSchema(etree.parse(xsd_path))
+    except etree.XMLSchemaParseError as e:
+        import xmlschema
+        logger.warning("lxml cannot compile %s (%s); falling back to xmlschema", xsd_path, e)
+        schema = xmlschema.XMLSchema11(xsd_path)
+    logger.info("XSD schema compiled: %s", xsd_path)
+    return schema, threading.Lock()
+
+
 class XMLValidator:
     """
     Validates XML documents against XSD schemas.
     """
     
+    # libxml2 reports every violation; keep responses and logs bounded
+    MAX_ERRORS = 50
+    
     def __init__(self, xsd_path: str):
         """
         Initialize validator with XSD schema.
@@ -25,6 +53,7 @@ class XMLValidator:
         """
         self.xsd_path = Path(xsd_path)
         self.schema = None
+        self._schema_lock = None
         self._load_schema()
     
     def _load_schema(self):
@@ -33,13 +62,63 @@ class XMLValidator:
             raise FileNotFoundError(f"XSD schema not found: {self.xsd_path}")
         
         try:
-            # Load schema using xmlschema (more robust)
-            self.schema = xmlschema.XMLSchema(str(self.xsd_path))
-            logger.info(f"XSD schema loaded: {self.xsd_path}")
+            # Reuse the compiled schema unless the XSD file changed
+            self.schema, self._schema_lock = _compile_schema(
+                str(self.xsd_path), self.xsd_path.stat().st_mtime_ns
+            )
         except Exception as e:
-            logger.error(f"Failed to load XSD schema: {e}")
+            logger.error("Failed to load XSD schema: %s", e)
             raise
     
+    def _format_errors(self, error_log) -> List[str]:
+        """Turn a libxml2 error log into at most MAX_ERRORS messages."""
+        errors = [
+            f"Schema validation error: line {error.line}: {error.message}"
+            if error.line else f"Schema validation error: {error.message}"
+            for error in list(error_log)[:self.MAX_ERRORS]
+        ]
+        if len(error_log) > self.MAX_ERRORS:
+            # Parser error logs are themselves truncated, so no exact count
+            errors.append("... further errors omitted")
+        return errors
+    
+    def _validate_with_xmlschema(self, source) -> Tuple[bool, List[str]]:
+        """Validate with the xmlschema fallback (file path or file object)."""
+        errors = []
+        with self._schema_lock:
+            for error in self.schema.iter_errors(source):
+                if len(errors) == self.MAX_ERRORS:
+                    errors.append("... further errors omitted")
+                    break
+                errors.append(f"Schema validation error: {error.reason}")
+        return not errors, errors
+    
+    def _validate_stream(self, source) -> Tuple[bool, List[str]]:
+        """
+        Validate a file path or binary file object while parsing it, dropping
+        each record once it has been checked, so memory stays flat for
+        documents of any size.
+        """
+        if not isinstance(self.schema, etree.XMLSchema):
+            return self._validate_with_xmlschema(source)
+        
+        with self._schema_lock:
+            # The parser's error log copies this thread's global libxml2 log;
+            # start empty so earlier, unrelated errors are not reported
+            etree.clear_error_log()
+            try:
+                for _, element in etree.iterparse(
+                    source, events=('end',), tag='record',
+                    schema=self.schema, huge_tree=True
+                ):
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del element.getparent()[0]
+            except etree.XMLSyntaxError as e:
+                return False, self._format_errors(e.error_log)
+        
+        return True, []
+    
     def validate(self, xml_path: str) -> Tuple[bool, List[str]]:
         """
         Validate XML file against the loaded schema.
@@ -58,19 +137,21 @@ class XMLValidator:
         errors = []
         
         try:
-            # Validate using xmlschema
-            self.schema.validate(str(xml_path))
-            logger.info(f"✓ XML validation successful: {xml_path}")
-            return True, []
-            
-        except xmlschema.XMLSchemaException as e:
-            errors.append(f"Schema validation error: {str(e)}")
-            logger.error(f"✗ XML validation failed: {e}")
-            return False, errors
+            # Validate with libxml2 against the compiled schema, streaming
+            if xml_path.suffix == '.gz':
+                with gzip.open(xml_path, 'rb') as xml_file:
+                    is_valid, errors = self._validate_stream(xml_file)
+            else:
+                is_valid, errors = self._validate_stream(str(xml_path))
+            if is_valid:
+                logger.info("✓ XML validation successful: %s", xml_path)
+            else:
+                logger.error("✗ XML validation failed: %s", errors)
+            return is_valid, errors
             
         except Exception as e:
             errors.append(f"Validation error: {str(e)}")
-            logger.error(f"✗ Unexpected validation error: {e}")
+            logger.error("✗ Unexpected validation error: %s", e)
             return False, errors
     
     def validate_string(self, xml_string: str) -> Tuple[bool, List[str]]:
@@ -86,16 +167,8 @@ class XMLValidator:
         errors = []
         
         try:
-            # Parse XML string
-            root = etree.fromstring(xml_string.encode('utf-8'))
-            
-            # Validate against schema
-            self.schema.validate(root)
-            return True, []
-            
-        except xmlschema.XMLSchemaException as e:
-            errors.append(f"Schema validation error: {str(e)}")
-            return False, errors
+            # Validate while parsing, without building the whole tree
+            return self._validate_stream(BytesIO(xml_string.encode('utf-8')))
             
         except Exception as e:
             errors.append(f"Validation error: {str(e)}")
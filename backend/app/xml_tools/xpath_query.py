@@ -2,10 +2,171 @@
 XPath and XQuery Support for IPVC Integration System
 """
 
+from collections import OrderedDict
 from lxml import etree
+from functools import cached_property, lru_cache
+from itertools import islice
+import copy
+import gzip
+import numpy as np
 import os
-from typing import List, Dict, Any, Optional
+import pandas as pd
+import re
+import threading
+from typing import Iterator, List, Dict, Any, Optional, Tuple, Union
 from app.core.models import Dataset
+from app.xml_tools.xml_generator import XMLGenerator
+
+
+@lru_cache(maxsize=256)
+def compile_xpath(xpath_expression: str) -> etree.XPath:
+    """
+    Compile an XPath expression once per process.
+    Repeated queries reuse the compiled object and skip the XPath parser.
+    String results are plain str (smart_strings=False): no caller needs
+    getparent() on them, and the proxy objects cost an allocation each.
+    """
+    try:
+        return etree.XPath(xpath_expression, smart_strings=False)
+    except etree.XPathSyntaxError as e:
+        raise Exception(f"Invalid XPath expression: {str(e)}")
+
+
+# Parsed XML trees shared across requests, keyed by (dataset_id, path, mtime_ns)
+# so a regenerated file is reparsed; least recently used trees are evicted
+TREE_CACHE_SIZE = 8
+_tree_cache: "OrderedDict[tuple, etree._ElementTree]" = OrderedDict()
+_tree_cache_lock = threading.Lock()
+
+
+def get_tree(dataset: Dataset) -> etree._ElementTree:
+    """
+    Return the parsed XML tree of a dataset, parsing the file only on a cache miss
+    """
+    path = dataset.xml_file_path
+    key = (dataset.id, path, os.stat(path).st_mtime_ns)
+    
+    with _tree_cache_lock:
+        tree = _tree_cache.get(key)
+        if tree is not None:
+            _tree_cache.move_to_end(key)
+            return tree
+    
+    # Whitespace between elements (from pretty-printed files) is not data;
+    # dropping it at parse time leaves fewer nodes for every query to walk
+    parser = etree.XMLParser(huge_tree=True, collect_ids=False, remove_blank_text=True)
+    tree = etree.parse(path, parser)
+    
+    with _tree_cache_lock:
+        # Drop older versions of this dataset's file before caching the new one
+        for stale_key in [k for k in _tree_cache if k[0] == dataset.id]:
+            del _tree_cache[stale_key]
+        _tree_cache[key] = tree
+        while len(_tree_cache) > TREE_CACHE_SIZE:
+            _tree_cache.popitem(last=False)
+    
+    return tree
+
+
+def invalidate_tree(dataset_id: int) -> None:
+    """Forget the cached XML tree(s) of a dataset"""
+    with _tree_cache_lock:
+        for key in [k for k in _tree_cache if k[0] == dataset_id]:
+            del _tree_cache[key]
+
+
+# Numeric record fields of cached trees, keyed by id(tree). Each entry holds
+# its tree so the id stays valid; entries whose tree has left the tree cache
+# are pruned when a new column is stored
+_column_cache: Dict[int, Tuple[etree._ElementTree, Dict[str, np.ndarray]]] = {}
+
+
+def narrow_exact(column: np.ndarray) -> np.ndarray:
+    """
+    Store a float64 column as int32 or float32 when every value survives the
+    conversion exactly, halving its memory; otherwise return it unchanged
+    """
+    if column.size and np.isfinite(column).all() and np.abs(column).max() < 2 ** 31:
+        as_int = column.astype(np.int32)
+        if np.array_equal(as_int, column):
+            return as_int
+    
+    with np.errstate(over='ignore'):
+        as_float = column.astype(np.float32)
+    if np.array_equal(as_float, column):
+        return as_float
+    return column
+
+
+def get_numeric_column(tree: etree._ElementTree, field: str) -> np.ndarray:
+    """
+    Non-empty values of a record field, extracted once per cached tree and
+    field. Stored in the narrowest exact dtype (see narrow_exact), so reduce
+    with dtype=np.float64. The array is shared and read-only.
+    """
+    with _tree_cache_lock:
+        entry = _column_cache.get(id(tree))
+        if entry is not None and field in entry[1]:
+            return entry[1][field]
+    
+    values = FIELD_VALUES_XPATH(tree.getroot(), field=field)
+    try:
+        column = np.fromiter((v for v in values if v), dtype=np.float64)
+    except ValueError:
+        raise Exception("Field values are not numeric")
+    column = narrow_exact(column)
+    column.flags.writeable = False
+    
+    with _tree_cache_lock:
+        live = {id(cached) for cached in _tree_cache.values()}
+        for key in [k for k in _column_cache if k not in live]:
+            del _column_cache[key]
+        if id(tree) in live:
+            _column_cache.setdefault(id(tree), (tree, {}))[1][field] = column
+    
+    return column
+
+
+# Files larger than this are not parsed into a tree up front: //record and
+# //record[predicate] queries are answered by streaming the file record by
+# record, and only other queries parse the whole document
+STREAMING_THRESHOLD = 256 * 1024 * 1024
+
+# //record with at most one predicate, captured without its brackets
+RECORD_QUERY_RE = re.compile(r'\s*//record\s*(?:\[([^\[\]]*)\])?\s*')
+# Predicates that look outside the record or depend on its position among
+# all records cannot be evaluated on one detached record at a time
+NON_LOCAL_PREDICATE_RE = re.compile(r'/|::|\.\.|\bposition\s*\(|\blast\s*\(')
+# Position predicates on //record that are answered by walking the root's
+# children from the start or the end, reading only the records returned:
+# [position() <= N], [position() < N], [position() > last()-N], [N], [last()]
+RECORD_RANGE_RE = re.compile(
+    r'\s*//record\s*\[\s*(?:'
+    r'position\(\)\s*(?P<op><=?)\s*(?P<head>\d+)'
+    r'|position\(\)\s*>\s*last\(\)\s*-\s*(?P<tail>\d+)'
+    r'|(?P<index>\d+)'
+    r'|last\(\)'
+    r')\s*\]\s*'
+)
+# FLWOR where clauses of the form Field="value" (or 'value'); the value is
+# bound as $where_value so every value shares one compiled expression
+WHERE_EQUALS_RE = re.compile(r"""\s*([^\W\d][\w.-]*)\s*=\s*(?:"([^"]*)"|'([^']*)')\s*""")
+
+
+# Bump when the shape of get_statistics() changes so stored stats are recomputed
+STATS_CACHE_VERSION = 1
+
+
+# Fixed expressions are compiled once at import; count() returns the number
+# directly instead of building a node list to take len() of
+COUNT_RECORDS_XPATH = etree.XPath('count(//record)')
+COUNT_ELEMENTS_XPATH = etree.XPath('count(//*)')
+
+# Field-based queries bind the field name (and group value) as XPath variables,
+# so each template is compiled once and user input is never spliced into XPath
+FIELD_VALUES_XPATH = etree.XPath('//record/*[local-name()=$field]/text()', smart_strings=False)
+GROUPED_RECORDS_XPATH = etree.XPath('//record[*[local-name()=$group_field]]')
+RECORDS_WHERE_XPATH = etree.XPath('//record[*[local-name()=$field]=$value]')
 
 
 class XPathQueryEngine:
@@ -13,56 +174,193 @@ class XPathQueryEngine:
     XPath query engine for XML files
     """
     
-    def __init__(self, dataset: Dataset):
+    def __init__(self, dataset: Dataset, load: bool = True):
         self.dataset = dataset
         self.xml_path = dataset.xml_file_path
         self.tree = None
         self.root = None
+        # Large files are streamed for record queries and parsed only on demand
+        self.streaming = False
         
-        if self.xml_path and os.path.exists(self.xml_path):
-            self.load_xml()
+        if load and self.xml_path and os.path.exists(self.xml_path):
+            if os.path.getsize(self.xml_path) > STREAMING_THRESHOLD:
+                self.streaming = True
+            else:
+                self.load_xml()
     
     def load_xml(self):
-        """Load XML file into memory"""
+        """Load XML file into memory (shared with other requests via the tree cache)"""
         try:
-            self.tree = etree.parse(self.xml_path)
+            self.tree = get_tree(self.dataset)
             self.root = self.tree.getroot()
             return True
         except Exception as e:
             raise Exception(f"Failed to load XML: {str(e)}")
     
-    def execute_xpath(self, xpath_expression: str) -> List[etree.Element]:
+    def execute_xpath(self, xpath_expression: Union[str, etree.XPath], **variables) -> List[etree.Element]:
         """
         Execute XPath query on the loaded XML
         
         Args:
-            xpath_expression: XPath expression to execute
+            xpath_expression: XPath expression (string or precompiled) to execute
+            **variables: Values for $variables referenced by the expression
             
         Returns:
             List of matching elements
         """
-        if not self.root:
+        if self.root is None and self.streaming:
+            # Precompiled expressions (as the REST views pass) stream too
+            results = self._stream_records(getattr(xpath_expression, 'path', xpath_expression), **variables)
+            if results is not None:
+                return results
+            # Anything else needs the whole document
+            self.load_xml()
+        
+        if self.root is None:
             raise Exception("XML not loaded. Generate XML first.")
         
+        if not variables:
+            results = self._record_range(xpath_expression)
+            if results is not None:
+                return results
+        
+        if isinstance(xpath_expression, str):
+            xpath_expression = compile_xpath(xpath_expression)
+        
         try:
-            results = self.root.xpath(xpath_expression)
+            results = xpath_expression(self.root, **variables)
             return results
         except Exception as e:
             raise Exception(f"XPath execution failed: {str(e)}")
     
-    def query_to_dict(self, xpath_expression: str) -> List[Dict[str, Any]]:
+    @cached_property
+    def _flat_records(self) -> bool:
+        """Whether record elements are exactly the root's record children"""
+        if self.root.tag == 'record':
+            return False
+        element_names = {XMLGenerator.normalize_xml_name(col['name']) for col in self.dataset.columns_list}
+        return 'record' not in element_names
+    
+    def _record_range(self, xpath_expression: Union[str, etree.XPath]) -> Optional[List[etree.Element]]:
         """
-        Execute XPath and return results as list of dictionaries
+        Answer the //record position queries of RECORD_RANGE_RE without
+        evaluating the predicate on every record; None for any other query
+        """
+        if isinstance(xpath_expression, etree.XPath):
+            xpath_expression = xpath_expression.path
+        
+        match = RECORD_RANGE_RE.fullmatch(xpath_expression)
+        if match is None or not self._flat_records:
+            return None
+        
+        if match['head'] is not None:
+            count = int(match['head']) - (match['op'] == '<')
+            return list(islice(self.root.iterchildren('record'), max(count, 0)))
+        
+        if match['index'] is not None:
+            index = int(match['index'])
+            if index < 1:
+                return []
+            return list(islice(self.root.iterchildren('record'), index - 1, index))
+        
+        # [position() > last()-N] or [last()]: the last N (or 1) records, in document order
+        count = int(match['tail']) if match['tail'] is not None else 1
+        return list(islice(self.root.iterchildren('record', reversed=True), count))[::-1]
+    
+    def numeric_column(self, field: str) -> np.ndarray:
+        """
+        Non-empty values of a record field (XML element name) as a read-only
+        array (int32, float32 or float64), cached with the parsed tree
+        """
+        if self.root is None and self.streaming:
+            self.load_xml()
+        
+        if self.root is None:
+            raise Exception("XML not loaded. Generate XML first.")
+        
+        return get_numeric_column(self.tree, field)
+    
+    def _stream_records(self, xpath_expression: str, **variables) -> Optional[List[etree.Element]]:
+        """
+        Answer //record or //record[predicate] with one pass over the file,
+        keeping only matching records in memory
         
         Args:
             xpath_expression: XPath expression
+            **variables: Values for $variables referenced by the predicate
+            
+        Returns:
+            List of matching record elements, or None if the query needs the whole tree
+        """
+        match = RECORD_QUERY_RE.fullmatch(xpath_expression)
+        if not match:
+            return None
+        predicate = match.group(1)
+        if predicate is not None and NON_LOCAL_PREDICATE_RE.search(predicate):
+            return None
+        test = compile_xpath(predicate) if predicate is not None else None
+        
+        results = []
+        opener = gzip.open if self.xml_path.endswith('.gz') else open
+        try:
+            with opener(self.xml_path, 'rb') as source:
+                records = etree.iterparse(
+                    source, tag='record', huge_tree=True, remove_blank_text=True
+                )
+                for position, (_, record) in enumerate(records, 1):
+                    if test is None:
+                        matched = True
+                    else:
+                        # A numeric predicate selects by position, like [3]
+                        value = test(record, **variables)
+                        matched = value == position if isinstance(value, float) else bool(value)
+                    if matched:
+                        results.append(copy.deepcopy(record))
+                    
+                    # Free the record and the records before it
+                    record.clear()
+                    while record.getprevious() is not None:
+                        del record.getparent()[0]
+        except Exception as e:
+            raise Exception(f"XPath execution failed: {str(e)}")
+        
+        return results
+    
+    def query_to_dict(self, xpath_expression: Union[str, etree.XPath], **variables) -> List[Dict[str, Any]]:
+        """
+        Execute XPath and return results as list of dictionaries
+        
+        Args:
+            xpath_expression: XPath expression (string or precompiled)
+            **variables: Values for $variables referenced by the expression
             
         Returns:
             List of dictionaries with element data
         """
-        results = self.execute_xpath(xpath_expression)
+        return list(self.iter_query_to_dict(xpath_expression, **variables))
+    
+    def iter_query_to_dict(self, xpath_expression: Union[str, etree.XPath],
+                           **variables) -> Iterator[Dict[str, Any]]:
+        """
+        Like query_to_dict(), but yields the dictionaries one at a time so
+        callers that only iterate never hold all of them at once
+        
+        Args:
+            xpath_expression: XPath expression (string or precompiled)
+            **variables: Values for $variables referenced by the expression
+            
+        Yields:
+            Dictionary with element data
+        """
+        results = self.execute_xpath(xpath_expression, **variables)
         
-        output = []
+        # count(), string(), boolean() etc. return one scalar, not a node-set
+        if not isinstance(results, list):
+            yield {'_value': str(results)}
+            return
+        
+        # Node-sets can mix elements with text and attribute values (unions),
+        # so the type is checked per item
         for element in results:
             if isinstance(element, etree._Element):
                 # Convert element to dict
@@ -71,83 +369,125 @@ class XPathQueryEngine:
                 # Add tag name
                 item['_tag'] = element.tag
                 
-                # Add text content
-                if element.text and element.text.strip():
-                    item['_text'] = element.text.strip()
+                # Add text content (each .text access builds a new string,
+                # so read it once)
+                text = element.text
+                if text:
+                    text = text.strip()
+                    if text:
+                        item['_text'] = text
                 
-                # Add attributes
-                if element.attrib:
-                    item['_attributes'] = dict(element.attrib)
+                # Add attributes (items() is one call, no _Attrib proxy)
+                attributes = element.items()
+                if attributes:
+                    item['_attributes'] = dict(attributes)
                 
                 # Add children
                 for child in element:
-                    if child.text and child.text.strip():
-                        item[child.tag] = child.text.strip()
+                    text = child.text
+                    if text:
+                        text = text.strip()
+                        if text:
+                            item[child.tag] = text
                 
-                output.append(item)
+                yield item
             else:
                 # For text nodes, attributes, etc.
-                output.append({'_value': str(element)})
-        
-        return output
+                yield {'_value': str(element)}
     
-    def get_element_text(self, xpath_expression: str) -> List[str]:
+    def get_element_text(self, xpath_expression: Union[str, etree.XPath], **variables) -> List[str]:
         """
         Get text content of elements matching XPath
         
         Args:
-            xpath_expression: XPath expression
+            xpath_expression: XPath expression (string or precompiled)
+            **variables: Values for $variables referenced by the expression
             
         Returns:
             List of text values
         """
-        results = self.execute_xpath(xpath_expression)
+        results = self.execute_xpath(xpath_expression, **variables)
         
         texts = []
         for element in results:
             if isinstance(element, etree._Element):
-                if element.text:
-                    texts.append(element.text.strip())
+                text = element.text
+                if text:
+                    texts.append(text.strip())
             else:
                 texts.append(str(element))
         
         return texts
     
-    def count_elements(self, xpath_expression: str) -> int:
+    def count_elements(self, xpath_expression: Union[str, etree.XPath]) -> int:
         """
         Count elements matching XPath
         
         Args:
-            xpath_expression: XPath expression
+            xpath_expression: XPath expression (string or precompiled)
             
         Returns:
             Number of matching elements
         """
+        # Let libxml2 count node-sets with count() rather than building the
+        # list of matches; streamed files already keep only the matches
+        if not (self.root is None and self.streaming):
+            expression = getattr(xpath_expression, 'path', xpath_expression)
+            try:
+                return int(self.execute_xpath(f'count({expression})'))
+            except Exception:
+                pass  # Not a node-set expression; count its result below
+        
         results = self.execute_xpath(xpath_expression)
+        if isinstance(results, float):
+            return int(results)
         return len(results)
     
     def get_statistics(self) -> Dict[str, Any]:
         """
         Get XML statistics using XPath
         
+        The result is stored on the dataset and served from there until the
+        XML is regenerated, so the tree is only walked once per file.
+        
         Returns:
             Dictionary with statistics
         """
-        if not self.root:
+        dataset = self.dataset
+        if dataset.stats_cache_version == STATS_CACHE_VERSION and dataset.stats_cache:
+            return dataset.stats_cache
+        
+        if self.root is None and self.xml_path and os.path.exists(self.xml_path):
+            self.load_xml()
+        if self.root is None:
             raise Exception("XML not loaded")
         
-        return {
+        stats = {
             'root_element': self.root.tag,
-            'total_records': self.count_elements('//record'),
-            'total_elements': self.count_elements('//*'),
+            'total_records': int(COUNT_RECORDS_XPATH(self.root)),
+            'total_elements': int(COUNT_ELEMENTS_XPATH(self.root)),
             'depth': self._get_tree_depth(self.root),
         }
+        
+        # update() leaves updated_at alone, so caches keyed on it stay valid
+        Dataset.objects.filter(pk=dataset.pk).update(
+            stats_cache=stats, stats_cache_version=STATS_CACHE_VERSION
+        )
+        dataset.stats_cache = stats
+        dataset.stats_cache_version = STATS_CACHE_VERSION
+        return stats
     
     def _get_tree_depth(self, element: etree.Element, depth: int = 0) -> int:
-        """Calculate XML tree depth"""
-        if len(element) == 0:
-            return depth
-        return max(self._get_tree_depth(child, depth + 1) for child in element)
+        """Calculate XML tree depth (iteratively, so deep documents cannot hit the recursion limit)"""
+        max_depth = depth
+        stack = [(element, depth)]
+        while stack:
+            node, node_depth = stack.pop()
+            if len(node):
+                stack.extend((child, node_depth + 1) for child in node)
+            elif node_depth > max_depth:
+                max_depth = node_depth
+        return max_depth
 
 
 class XPathQueryExamples:
@@ -229,7 +569,12 @@ class XPathQueryBuilder:
     
     @staticmethod
     def select_records_where(field_name: str, value: str) -> str:
-        """XPath to select records where field equals value"""
+        """
+        XPath to select records where field equals value
+        The value is spliced in unescaped and every value yields a new
+        expression to compile; XQuerySupport.select_records_where() binds
+        both as variables of one precompiled expression instead.
+        """
         return f'//record[{field_name}="{value}"]'
     
     @staticmethod
@@ -244,7 +589,11 @@ class XPathQueryBuilder:
     
     @staticmethod
     def select_distinct_values(field_name: str) -> str:
-        """XPath to get distinct values (approximate)"""
+        """
+        XPath to get distinct values (approximate)
+        The preceding:: test is quadratic in the number of records; prefer
+        XQuerySupport.distinct_values() for large datasets.
+        """
         return f'//record/{field_name}[not(. = preceding::{field_name})]'
     
     @staticmethod
@@ -267,6 +616,54 @@ class XQuerySupport:
     def __init__(self, dataset: Dataset):
         self.xpath_engine = XPathQueryEngine(dataset)
     
+    def resolve_field(self, field: str) -> str:
+        """
+        Map a column name to its XML element name, rejecting unknown fields
+        
+        Args:
+            field: Column name, original or as normalized in the XML
+            
+        Returns:
+            XML element name of the column
+        """
+        columns = self.xpath_engine.dataset.columns_list
+        element_names = {XMLGenerator.normalize_xml_name(col['name']) for col in columns}
+        
+        element_name = XMLGenerator.normalize_xml_name(field)
+        if element_name not in element_names:
+            raise ValueError(f"Unknown field: {field}")
+        return element_name
+    
+    def select_records_where(self, field: str, value: str) -> List[etree.Element]:
+        """
+        Records whose field equals value
+        
+        Args:
+            field: Column name
+            value: Value to match (any characters, no escaping needed)
+            
+        Returns:
+            List of matching record elements
+        """
+        return self.xpath_engine.execute_xpath(
+            RECORDS_WHERE_XPATH, field=self.resolve_field(field), value=value
+        )
+    
+    def distinct_values(self, field: str) -> List[str]:
+        """
+        Distinct non-empty values of a field in document order, in one pass
+        
+        Args:
+            field: Column name
+            
+        Returns:
+            List of distinct values
+        """
+        values = self.xpath_engine.execute_xpath(
+            FIELD_VALUES_XPATH, field=self.resolve_field(field)
+        )
+        return list(dict.fromkeys(value for value in map(str.strip, values) if value))
+    
     def execute_flwor_like(self, 
                            for_xpath: str,
                            where_condition: Optional[str] = None,
@@ -287,8 +684,15 @@ class XQuerySupport:
         """
         # Build XPath expression
         xpath = for_xpath
+        variables = {}
         
         if where_condition:
+            match = WHERE_EQUALS_RE.fullmatch(where_condition)
+            if match:
+                field, double_quoted, single_quoted = match.groups()
+                variables['where_value'] = double_quoted if double_quoted is not None else single_quoted
+                where_condition = f'{field}=$where_value'
+            
             # Add where clause
             if '[' in xpath:
                 # Insert condition before existing predicate
@@ -300,37 +704,34 @@ class XQuerySupport:
             # Add return field
             xpath = f'{xpath}/{return_field}'
         
-        return self.xpath_engine.query_to_dict(xpath)
+        return self.xpath_engine.query_to_dict(xpath, **variables)
     
-    def aggregate(self, field_xpath: str, operation: str) -> Any:
+    def aggregate(self, field: str, operation: str) -> Any:
         """
         Perform aggregate operations
         
         Args:
-            field_xpath: XPath to numeric field
+            field: Numeric field (column) name
             operation: 'sum', 'avg', 'min', 'max', 'count'
             
         Returns:
             Aggregated value
         """
-        values = self.xpath_engine.get_element_text(field_xpath)
+        field = self.resolve_field(field)
         
-        # Try to convert to numbers
-        try:
-            numeric_values = [float(v) for v in values if v]
-        except ValueError:
-            raise Exception("Field values are not numeric")
+        # Parsed once per XML file and field; every operation is one NumPy reduction
+        numeric_values = self.xpath_engine.numeric_column(field)
         
         if operation == 'count':
-            return len(numeric_values)
+            return int(numeric_values.size)
         elif operation == 'sum':
-            return sum(numeric_values)
+            return float(numeric_values.sum(dtype=np.float64))
         elif operation == 'avg':
-            return sum(numeric_values) / len(numeric_values) if numeric_values else 0
+            return float(numeric_values.mean(dtype=np.float64)) if numeric_values.size else 0
         elif operation == 'min':
-            return min(numeric_values) if numeric_values else None
+            return float(numeric_values.min()) if numeric_values.size else None
         elif operation == 'max':
-            return max(numeric_values) if numeric_values else None
+            return float(numeric_values.max()) if numeric_values.size else None
         else:
             raise ValueError(f"Unknown operation: {operation}")
     
@@ -345,36 +746,53 @@ class XQuerySupport:
         Returns:
             Dictionary with grouped results
         """
-        # Get distinct values of group field
-        distinct_xpath = XPathQueryBuilder.select_distinct_values(group_field)
-        distinct_values = self.xpath_engine.get_element_text(distinct_xpath)
+        group_field = self.resolve_field(group_field)
+        if aggregate_field:
+            aggregate_field = self.resolve_field(aggregate_field)
+        
+        # One sweep over the records; grouping and aggregation run in NumPy
+        records = self.xpath_engine.execute_xpath(GROUPED_RECORDS_XPATH, group_field=group_field)
+        keys = [record.findtext(group_field) for record in records]
+        kept = [i for i, key in enumerate(keys) if key]
         
         results = {}
-        for value in distinct_values:
-            if not value:
-                continue
-            
-            # Count records for this value
-            count_xpath = f'count(//record[{group_field}="{value}"])'
-            count = self.xpath_engine.execute_xpath(count_xpath)
+        if not kept:
+            return results
+        
+        groups, first, inverse = np.unique(
+            np.array([keys[i] for i in kept]), return_index=True, return_inverse=True
+        )
+        counts = np.bincount(inverse, minlength=len(groups))
+        
+        stats = None
+        if aggregate_field:
+            raw = np.array([records[i].findtext(aggregate_field) or '' for i in kept], dtype=object)
+            values = pd.to_numeric(raw, errors='coerce').astype(np.float64)
+            valid = ~np.isnan(values)
+            # A group with any non-numeric value gets no aggregates
+            invalid = np.bincount(inverse, weights=(raw != '') & ~valid, minlength=len(groups)) > 0
             
+            numeric = np.bincount(inverse, weights=valid, minlength=len(groups))
+            sums = np.bincount(inverse, weights=np.where(valid, values, 0.0), minlength=len(groups))
+            mins = np.full(len(groups), np.inf)
+            maxs = np.full(len(groups), -np.inf)
+            np.minimum.at(mins, inverse[valid], values[valid])
+            np.maximum.at(maxs, inverse[valid], values[valid])
+            stats = (invalid, numeric, sums, mins, maxs)
+        
+        # Report groups in document order, like the XPath distinct-values sweep did
+        for g in np.argsort(first, kind='stable'):
+            value = str(groups[g])
             results[value] = {
-                'count': int(count[0]) if count else 0
+                'count': int(counts[g])
             }
             
-            # If aggregate field specified, calculate aggregates
-            if aggregate_field:
-                value_xpath = f'//record[{group_field}="{value}"]/{aggregate_field}/text()'
-                values = self.xpath_engine.get_element_text(value_xpath)
-                
-                try:
-                    numeric_values = [float(v) for v in values if v]
-                    if numeric_values:
-                        results[value]['sum'] = sum(numeric_values)
-                        results[value]['avg'] = sum(numeric_values) / len(numeric_values)
-                        results[value]['min'] = min(numeric_values)
-                        results[value]['max'] = max(numeric_values)
-                except ValueError:
-                    pass
+            if stats is not None:
+                invalid, numeric, sums, mins, maxs = stats
+                if not invalid[g] and numeric[g]:
+                    results[value]['sum'] = float(sums[g])
+                    results[value]['avg'] = float(sums[g] / numeric[g])
+                    results[value]['min'] = float(mins[g])
+                    results[value]['max'] = float(maxs[g])
         
         return results
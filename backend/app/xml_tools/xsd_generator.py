@@ -6,10 +6,18 @@ based on dataset structure.
 from lxml import etree
 from pathlib import Path
 from typing import Dict, List
+from app.xml_tools.xml_generator import XMLGenerator
 import logging
 
 logger = logging.getLogger(__name__)
 
+# XML Schema namespace and the qualified tags used to build schemas
+XS_NAMESPACE = "http://www.w3.org/2001/XMLSchema"
+XS_SCHEMA = f"{{{XS_NAMESPACE}}}schema"
+XS_ELEMENT = f"{{{XS_NAMESPACE}}}element"
+XS_COMPLEX_TYPE = f"{{{XS_NAMESPACE}}}complexType"
+XS_SEQUENCE = f"{{{XS_NAMESPACE}}}sequence"
+
 
 class XSDGenerator:
     """
@@ -46,12 +54,9 @@ class XSDGenerator:
             lxml.etree.Element: The complete XSD schema
         """
         # Create XSD root element
-        xs_namespace = "http://www.w3.org/2001/XMLSchema"
-        XS = "{%s}" % xs_namespace
-        
-        nsmap = {'xs': xs_namespace}
+        nsmap = {'xs': XS_NAMESPACE}
         schema = etree.Element(
-            XS + "schema",
+            XS_SCHEMA,
             nsmap=nsmap,
             attrib={
                 'elementFormDefault': 'qualified',
@@ -60,26 +65,26 @@ class XSDGenerator:
         )
         
         # Create root element definition
-        root_element = etree.SubElement(schema, XS + "element", name=self.dataset_name)
-        root_complex_type = etree.SubElement(root_element, XS + "complexType")
-        root_sequence = etree.SubElement(root_complex_type, XS + "sequence")
+        root_element = etree.SubElement(schema, XS_ELEMENT, name=self.dataset_name)
+        root_complex_type = etree.SubElement(root_element, XS_COMPLEX_TYPE)
+        root_sequence = etree.SubElement(root_complex_type, XS_SEQUENCE)
         
         # Add 'record' element that can repeat
         record_element = etree.SubElement(
             root_sequence,
-            XS + "element",
+            XS_ELEMENT,
             name="record",
             minOccurs="0",
             maxOccurs="unbounded"
         )
         
         # Define record structure
-        record_complex_type = etree.SubElement(record_element, XS + "complexType")
-        record_sequence = etree.SubElement(record_complex_type, XS + "sequence")
+        record_complex_type = etree.SubElement(record_element, XS_COMPLEX_TYPE)
+        record_sequence = etree.SubElement(record_complex_type, XS_SEQUENCE)
         
         # Add each column as an element
         for column in self.columns:
-            self._add_column_element(record_sequence, column, XS)
+            self._add_column_element(record_sequence, column)
         
         return schema
     
@@ -94,25 +99,16 @@ class XSDGenerator:
         Returns:
             str: Valid XML element name
         """
-        import re
-        
-        # Replace spaces and special chars with underscore
-        normalized = re.sub(r'[^\w]', '_', name)
-        
-        # Ensure it starts with letter or underscore
-        if normalized and not normalized[0].isalpha() and normalized[0] != '_':
-            normalized = '_' + normalized
-        
-        return normalized
+        # Same rules as the XML generator, so elements and schema always agree
+        return XMLGenerator.normalize_xml_name(name)
     
-    def _add_column_element(self, parent: etree.Element, column: Dict, xs_prefix: str):
+    def _add_column_element(self, parent: etree.Element, column: Dict):
         """
         Add a column element to the XSD schema.
         
         Args:
             parent: Parent XML element
             column: Column metadata dict
-            xs_prefix: XSD namespace prefix
         """
         column_name = self.normalize_xml_name(column['name'])
         data_type = column.get('data_type', 'string')
@@ -131,7 +127,7 @@ class XSDGenerator:
         if nullable:
             attribs['minOccurs'] = '0'
         
-        etree.SubElement(parent, xs_prefix + "element", **attribs)
+        etree.SubElement(parent, XS_ELEMENT, **attribs)
     
     def save_xsd(self, output_path: str) -> str:
         """
@@ -158,7 +154,7 @@ class XSDGenerator:
             encoding='utf-8'
         )
         
-        logger.info(f"XSD schema saved to {output_path}")
+        logger.info("XSD schema saved to %s", output_path)
         return str(output_path)
     
     @staticmethod
@@ -172,13 +168,14 @@ class XSDGenerator:
         Returns:
             XSDGenerator instance
         """
-        columns = []
-        for col in dataset.columns.all().order_by('position'):
-            columns.append({
-                'name': col.name,
-                'data_type': col.data_type,
-                'nullable': col.nullable,
-                'unique': col.unique
-            })
+        columns = [
+            {
+                'name': col['name'],
+                'data_type': col['data_type'],
+                'nullable': col['nullable'],
+                'unique': col['unique']
+            }
+            for col in dataset.columns_list
+        ]
         
         return XSDGenerator(dataset.name, columns)
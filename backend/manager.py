@@ -3,8 +3,14 @@ Main manager script for IPVC Integration System.
 Provides CLI commands for dataset management and system operations.
 """
 
+import contextlib
+import hashlib
+import json
 import os
+import shlex
 import sys
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
 
 # Add backend to Python path
@@ -15,13 +21,12 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 import django
 django.setup()
 
-from app.csv_processor.processor import CSVImporter, CSVAnalyzer
-from app.core.models import Dataset, DataRecord
-from app.database.manager import DatabaseManager
-from app.xml_tools.xml_service import XMLService
-from django.conf import settings
+# Only the model is imported up front; the CSV (pandas/pyarrow) and XML (lxml)
+# modules are imported by the commands that use them, so list/show start fast
+from app.core.models import Dataset
 import argparse
 import logging
+import orjson
 
 logging.basicConfig(
     level=logging.INFO,
@@ -29,6 +34,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Separator lines of the CLI output
+BANNER_60 = '=' * 60
+BANNER_80 = '=' * 80
+# Columns of the list command
+LIST_ROW_FORMAT = "{:<30} {:<10} {:<10} {:<15} {:<15}"
+
+# analyze results are cached per CSV path and reused while the file is unchanged
+ANALYSIS_CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'ipvc'
+# Part of the cache key; bump it whenever CSVAnalyzer.analyze_csv output changes
+ANALYSIS_CACHE_VERSION = 2
+
 
 class IPVCManager:
     """Main management class for IPVC Integration System"""
@@ -36,9 +52,11 @@ class IPVCManager:
     @staticmethod
     def import_csv(file_path: str, name: str = None, description: str = None):
         """Import a CSV file into the database"""
-        print(f"\n{'='*60}")
+        from app.csv_processor.processor import CSVImporter
+        
+        print(f"\n{BANNER_60}")
         print(f"Importing CSV: {file_path}")
-        print(f"{'='*60}\n")
+        print(f"{BANNER_60}\n")
         
         try:
             dataset = CSVImporter.import_csv(
@@ -60,28 +78,40 @@ class IPVCManager:
     @staticmethod
     def list_datasets():
         """List all imported datasets"""
-        datasets = Dataset.objects.all()
+        # Plain tuples of the listed columns; structure and stats_cache can be large JSON
+        datasets = list(Dataset.objects.values_list(
+            'name', 'total_rows', 'total_columns', 'status', 'created_at'
+        ))
         
-        print(f"\n{'='*80}")
-        print(f"{'DATASET NAME':<30} {'ROWS':<10} {'COLS':<10} {'STATUS':<15} {'DATE':<15}")
-        print(f"{'='*80}")
+        print(f"\n{BANNER_80}")
+        print(LIST_ROW_FORMAT.format('DATASET NAME', 'ROWS', 'COLS', 'STATUS', 'DATE'))
+        print(BANNER_80)
         
-        for ds in datasets:
-            print(f"{ds.name:<30} {ds.total_rows:<10} {ds.total_columns:<10} "
-                  f"{ds.status:<15} {ds.created_at.strftime('%Y-%m-%d'):<15}")
+        # Rows are joined and written with one print
+        rows = [
+            LIST_ROW_FORMAT.format(name, total_rows, total_columns, status,
+                                   created_at.strftime('%Y-%m-%d'))
+            for name, total_rows, total_columns, status, created_at in datasets
+        ]
+        if rows:
+            print("\n".join(rows))
         
-        print(f"{'='*80}")
-        print(f"Total datasets: {datasets.count()}\n")
+        print(BANNER_80)
+        print(f"Total datasets: {len(datasets)}\n")
     
     @staticmethod
     def show_dataset(name: str, limit: int = 10):
         """Show dataset details and sample data"""
         try:
-            dataset = Dataset.objects.get(name=name)
+            # Only the printed fields; structure and stats_cache can be large JSON
+            dataset = Dataset.objects.only(
+                'name', 'description', 'source_file', 'total_rows',
+                'total_columns', 'status', 'created_at'
+            ).get(name=name)
             
-            print(f"\n{'='*60}")
+            print(f"\n{BANNER_60}")
             print(f"Dataset: {dataset.name}")
-            print(f"{'='*60}")
+            print(BANNER_60)
             print(f"Description: {dataset.description}")
             print(f"Source: {dataset.source_file}")
             print(f"Rows: {dataset.total_rows}")
@@ -90,14 +120,13 @@ class IPVCManager:
             print(f"Created: {dataset.created_at}")
             print(f"\nColumns:")
             
-            for col in dataset.columns.all()[:10]:
-                print(f"  - {col.name} ({col.data_type})")
+            columns = dataset.columns.values_list('name', 'data_type')[:10]
+            print("\n".join(f"  - {col_name} ({data_type})" for col_name, data_type in columns))
             
             print(f"\nSample data (first {limit} rows):")
-            records = dataset.records.all()[:limit]
+            records = dataset.records.order_by('row_number').values_list('row_number', 'data')[:limit]
             
-            for record in records:
-                print(f"  Row {record.row_number}: {record.data}")
+            print("\n".join(f"  Row {row_number}: {data}" for row_number, data in records))
             
         except Dataset.DoesNotExist:
             print(f"✗ Dataset '{name}' not found")
@@ -106,11 +135,13 @@ class IPVCManager:
     @staticmethod
     def db_info():
         """Show database information"""
+        from app.database.manager import DatabaseManager
+        
         info = DatabaseManager.get_database_info()
         
-        print(f"\n{'='*60}")
+        print(f"\n{BANNER_60}")
         print(f"Database Information")
-        print(f"{'='*60}")
+        print(BANNER_60)
         print(f"Engine: {info['engine']}")
         print(f"Name: {info['name']}")
         print(f"Host: {info['host']}")
@@ -122,58 +153,98 @@ class IPVCManager:
         else:
             print(f"Status: ✗ Connection failed")
         
-        print(f"{'='*60}\n")
+        print(f"{BANNER_60}\n")
     
     @staticmethod
     def analyze_csv(file_path: str):
         """Analyze a CSV file without importing"""
-        print(f"\n{'='*60}")
+        print(f"\n{BANNER_60}")
         print(f"Analyzing: {file_path}")
-        print(f"{'='*60}\n")
+        print(f"{BANNER_60}\n")
         
-        analysis = CSVAnalyzer.analyze_csv(file_path)
+        analysis = IPVCManager._cached_analysis(file_path)
         
         print(f"Total Rows: {analysis['total_rows']}")
         print(f"Total Columns: {analysis['total_columns']}")
         print(f"Delimiter: {repr(analysis['delimiter'])}")
         print(f"\nColumn Details:")
         
-        for col in analysis['columns']:
-            print(f"\n  {col['name']}:")
-            print(f"    Type: {col['data_type']}")
-            print(f"    Nullable: {col['nullable']}")
-            print(f"    Unique values: {col['unique_count']}")
-            print(f"    Null count: {col['null_count']}")
-            print(f"    Samples: {col['sample_values'][:3]}")
+        print("".join(
+            f"\n  {col['name']}:\n"
+            f"    Type: {col['data_type']}\n"
+            f"    Nullable: {col['nullable']}\n"
+            f"    Unique values: {col['unique_count']}\n"
+            f"    Null count: {col['null_count']}\n"
+            f"    Samples: {col['sample_values'][:3]}\n"
+            for col in analysis['columns']
+        ))
+    
+    @staticmethod
+    def _cached_analysis(file_path: str) -> dict:
+        """CSVAnalyzer.analyze_csv, cached in memory and on disk keyed by file size and mtime"""
+        path = os.path.abspath(file_path)
+        return IPVCManager._load_analysis(path, os.path.getsize(path), os.path.getmtime(path))
+    
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _load_analysis(path: str, size: int, mtime: float) -> dict:
+        """Analysis of an absolute CSV path from the disk cache, or computed and stored there"""
+        key = [ANALYSIS_CACHE_VERSION, size, mtime]
+        cache_file = ANALYSIS_CACHE_DIR / f"{hashlib.sha1(path.encode()).hexdigest()}.json"
+        
+        try:
+            with open(cache_file, encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('key') == key:
+                return cached['analysis']
+        except (OSError, ValueError):
+            pass
+        
+        from app.csv_processor.processor import CSVAnalyzer
+        analysis = CSVAnalyzer.analyze_csv(path)
+        
+        # A cache that cannot be written only costs the next run a re-analysis;
+        # an analysis that is not plain JSON data is not cached at all, so a
+        # cache hit always returns exactly what analyze_csv did
+        try:
+            payload = json.dumps({'key': key, 'analysis': analysis})
+            ANALYSIS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                f.write(payload)
+        except (OSError, TypeError, ValueError) as e:
+            logger.debug("Could not write analysis cache %s: %s", cache_file, e)
         
-        print()
+        return analysis
     
     @staticmethod
     def generate_xml(name: str, limit: int = None):
         """Generate XML and XSD for a dataset"""
+        from app.xml_tools.xml_service import XMLService
+        
         try:
             dataset = Dataset.objects.get(name=name)
             
-            print(f"\n{'='*60}")
+            print(f"\n{BANNER_60}")
             print(f"Generating XML for: {dataset.name}")
-            print(f"{'='*60}\n")
+            print(f"{BANNER_60}\n")
             
             # Create XML service
             xml_service = XMLService(dataset)
             
-            # Generate XSD
-            print("Step 1: Generating XSD schema...")
-            xsd_path = xml_service.generate_xsd()
-            print(f"✓ XSD generated: {xsd_path}\n")
-            
-            # Generate XML
-            print(f"Step 2: Generating XML (limit: {limit or 'all records'})...")
-            xml_path = xml_service.generate_xml(limit=limit)
-            print(f"✓ XML generated: {xml_path}\n")
+            # Steps 1 and 2 overlap: the XSD is written on a worker thread
+            # while the records are streamed to the XML file; step 3 validates
+            print(f"Generating XSD schema and XML (limit: {limit or 'all records'}) "
+                  "and validating XML against XSD...")
+            result = xml_service.generate_and_validate(limit=limit)
+            if result['errors']:
+                raise RuntimeError(result['errors'][0])
             
-            # Validate
-            print("Step 3: Validating XML against XSD...")
-            is_valid, errors = xml_service.validate_xml()
+            xsd_path = result['xsd_path']
+            xml_path = result['xml_path']
+            is_valid = result['validation_passed']
+            errors = result['validation_errors']
+            print(f"✓ XSD generated: {xsd_path}")
+            print(f"✓ XML generated: {xml_path}")
             
             if is_valid:
                 print("✓ XML validation PASSED\n")
@@ -184,12 +255,12 @@ class IPVCManager:
                     print(f"  - {error}")
                 print()
             
-            print(f"{'='*60}")
+            print(BANNER_60)
             print("Summary:")
             print(f"  XSD: {xsd_path}")
             print(f"  XML: {xml_path}")
             print(f"  Valid: {'Yes' if is_valid else 'No'}")
-            print(f"{'='*60}\n")
+            print(f"{BANNER_60}\n")
             
         except Dataset.DoesNotExist:
             print(f"✗ Dataset '{name}' not found")
@@ -201,12 +272,14 @@ class IPVCManager:
     @staticmethod
     def validate_xml(name: str):
         """Validate XML against XSD for a dataset"""
+        from app.xml_tools.xml_service import XMLService
+        
         try:
             dataset = Dataset.objects.get(name=name)
             
-            print(f"\n{'='*60}")
+            print(f"\n{BANNER_60}")
             print(f"Validating XML for: {dataset.name}")
-            print(f"{'='*60}\n")
+            print(f"{BANNER_60}\n")
             
             xml_service = XMLService(dataset)
             is_valid, errors = xml_service.validate_xml()
@@ -232,7 +305,6 @@ class IPVCManager:
     def xpath_query(name: str, query: str, output_format: str = 'text'):
         """Execute XPath query on dataset XML"""
         from app.xml_tools.xpath_query import XPathQueryEngine
-        import json
         
         try:
             dataset = Dataset.objects.get(name=name)
@@ -245,12 +317,12 @@ class IPVCManager:
             print(f"Generate XML first: python manager.py xml {name} -l 100")
             sys.exit(1)
         
-        print(f"\n{'='*60}")
+        print(f"\n{BANNER_60}")
         print(f"XPath Query: {dataset.name}")
-        print(f"{'='*60}")
+        print(BANNER_60)
         print(f"Query: {query}")
         print(f"Format: {output_format}")
-        print(f"{'='*60}\n")
+        print(f"{BANNER_60}\n")
         
         try:
             xpath_engine = XPathQueryEngine(dataset)
@@ -258,8 +330,9 @@ class IPVCManager:
             if output_format == 'text':
                 results = xpath_engine.get_element_text(query)
                 print(f"Results ({len(results)} items):")
-                for i, result in enumerate(results[:50], 1):  # Show first 50
-                    print(f"  {i}. {result}")
+                print("\n".join(  # Show first 50
+                    f"  {i}. {result}" for i, result in enumerate(results[:50], 1)
+                ))
                 if len(results) > 50:
                     print(f"  ... and {len(results) - 50} more")
             
@@ -268,23 +341,26 @@ class IPVCManager:
                 print(f"Count: {count}")
             
             else:  # dict
-                results = xpath_engine.query_to_dict(query)
-                print(f"Results ({len(results)} items):")
-                for i, result in enumerate(results[:10], 1):  # Show first 10
-                    print(f"\n{i}. {json.dumps(result, indent=2)}")
-                if len(results) > 10:
-                    print(f"\n... and {len(results) - 10} more")
+                results = xpath_engine.iter_query_to_dict(query)
+                shown = list(islice(results, 10))  # Show first 10
+                remaining = sum(1 for _ in results)
+                print(f"Results ({len(shown) + remaining} items):")
+                for i, result in enumerate(shown, 1):
+                    print(f"\n{i}. {orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()}")
+                if remaining:
+                    print(f"\n... and {remaining} more")
             
-            print(f"\n{'='*60}")
+            print(f"\n{BANNER_60}")
             print("✓ Query executed successfully")
-            print(f"{'='*60}\n")
+            print(f"{BANNER_60}\n")
             
         except Exception as e:
             print(f"\n✗ Query failed: {e}")
             sys.exit(1)
 
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
+    """Argument parser for all CLI commands"""
     parser = argparse.ArgumentParser(
         description='IPVC Integration System Manager',
         formatter_class=argparse.RawDescriptionHelpFormatter
@@ -329,14 +405,45 @@ def main():
     xpath_parser.add_argument('-f', '--format', choices=['dict', 'text', 'count'], 
                              default='text', help='Output format')
     
-    args = parser.parse_args()
-    
-    if not args.command:
-        parser.print_help()
-        sys.exit(1)
+    # Batch command
+    batch_parser = subparsers.add_parser(
+        'batch', help='Run several commands in one process (one per line)'
+    )
+    batch_parser.add_argument('file', nargs='?', default='-',
+                              help='File with commands, e.g. "show Retail -l 5" (default: stdin)')
     
-    manager = IPVCManager()
+    return parser
+
+
+def run_batch(parser: argparse.ArgumentParser, manager: 'IPVCManager', file: str):
+    """
+    Run the commands listed in a file (or stdin), one per line.
+    Django setup, imports and the database connection are paid once for
+    all of them; a failing command is reported and the batch continues.
+    """
+    failed = 0
+    stream = sys.stdin if file == '-' else open(file, encoding='utf-8')
+    with contextlib.nullcontext(stream) if file == '-' else stream:
+        for line in stream:
+            argv = shlex.split(line, comments=True)
+            if not argv:
+                continue
+            try:
+                args = parser.parse_args(argv)
+                if args.command in (None, 'batch'):
+                    parser.error(f"not a batch command: {line.strip()}")
+                run_command(manager, args)
+            except SystemExit as e:
+                if e.code:
+                    failed += 1
     
+    if failed:
+        print(f"✗ {failed} batch command(s) failed")
+        sys.exit(1)
+
+
+def run_command(manager: 'IPVCManager', args: argparse.Namespace):
+    """Dispatch parsed arguments to the matching IPVCManager method"""
     if args.command == 'import':
         manager.import_csv(args.file, args.name, args.description)
     elif args.command == 'list':
@@ -355,5 +462,21 @@ def main():
         manager.xpath_query(args.name, args.query, args.format)
 
 
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    
+    if not args.command:
+        parser.print_help()
+        sys.exit(1)
+    
+    manager = IPVCManager()
+    
+    if args.command == 'batch':
+        run_batch(parser, manager, args.file)
+    else:
+        run_command(manager, args)
+
+
 if __name__ == '__main__':
     main()
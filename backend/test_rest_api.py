@@ -4,23 +4,41 @@ Tests all REST API endpoints for the IPVC Integration System
 """
 
 import requests
-import json
+import orjson
 from pprint import pprint
 
 # Base URL
 BASE_URL = "http://127.0.0.1:8000/api"
 
+# One session for all tests, so requests reuse a kept-alive connection
+SESSION = requests.Session()
 
-def print_response(title, response):
-    """Pretty print API response"""
+
+def print_response(title, response, max_bytes=None):
+    """
+    Pretty print API response.
+    With max_bytes, the response must be streamed (stream=True): only that
+    many bytes are read, and the body is printed as text if it was cut off.
+    """
     print(f"\n{'='*80}")
     print(f"{title}")
     print(f"{'='*80}")
     print(f"Status: {response.status_code}")
     
+    if max_bytes is not None:
+        with response:
+            body = response.raw.read(max_bytes, decode_content=True)
+        try:
+            data = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            print(body.decode(errors='replace'))
+            return
+        print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
+        return
+    
     try:
-        data = response.json()
-        print(json.dumps(data, indent=2)[:2000])  # Limit output
+        data = orjson.loads(response.content)
+        print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()[:2000])  # Limit output
     except:
         print(response.text[:500])
 
@@ -28,36 +46,38 @@ def print_response(title, response):
 def test_list_datasets():
     """Test GET /api/datasets/"""
     print("\n\n🔍 TEST 1: List All Datasets")
-    response = requests.get(f"{BASE_URL}/datasets/")
+    response = SESSION.get(f"{BASE_URL}/datasets/")
     print_response("GET /api/datasets/", response)
-    return response.json() if response.status_code == 200 else None
+    return orjson.loads(response.content) if response.status_code == 200 else None
 
 
 def test_dataset_detail(dataset_id):
     """Test GET /api/datasets/{id}/"""
     print(f"\n\n🔍 TEST 2: Dataset Detail (ID={dataset_id})")
-    response = requests.get(f"{BASE_URL}/datasets/{dataset_id}/")
+    response = SESSION.get(f"{BASE_URL}/datasets/{dataset_id}/")
     print_response(f"GET /api/datasets/{dataset_id}/", response)
 
 
 def test_dataset_columns(dataset_id):
     """Test GET /api/datasets/{id}/columns/"""
     print(f"\n\n🔍 TEST 3: Dataset Columns (ID={dataset_id})")
-    response = requests.get(f"{BASE_URL}/datasets/{dataset_id}/columns/")
+    response = SESSION.get(f"{BASE_URL}/datasets/{dataset_id}/columns/")
     print_response(f"GET /api/datasets/{dataset_id}/columns/", response)
 
 
 def test_dataset_records(dataset_id, limit=10):
     """Test GET /api/datasets/{id}/records/"""
     print(f"\n\n🔍 TEST 4: Dataset Records (ID={dataset_id}, limit={limit})")
-    response = requests.get(f"{BASE_URL}/datasets/{dataset_id}/records/?limit={limit}")
+    response = SESSION.get(f"{BASE_URL}/datasets/{dataset_id}/records/?limit={limit}")
     print_response(f"GET /api/datasets/{dataset_id}/records/?limit={limit}", response)
+    if response.status_code == 200:
+        assert response.headers.get('Content-Encoding') == 'gzip', "JSON responses should be gzip-compressed"
 
 
 def test_dataset_logs(dataset_id):
     """Test GET /api/datasets/{id}/logs/"""
     print(f"\n\n🔍 TEST 5: Dataset Import Logs (ID={dataset_id})")
-    response = requests.get(f"{BASE_URL}/datasets/{dataset_id}/logs/")
+    response = SESSION.get(f"{BASE_URL}/datasets/{dataset_id}/logs/")
     print_response(f"GET /api/datasets/{dataset_id}/logs/", response)
 
 
@@ -71,18 +91,20 @@ def test_generate_xml(dataset_id, limit=5):
         "validate": True
     }
     
-    response = requests.post(
+    response = SESSION.post(
         f"{BASE_URL}/datasets/{dataset_id}/generate_xml/",
-        json=data
+        data=orjson.dumps(data),
+        headers={'Content-Type': 'application/json'},
+        stream=True
     )
-    print_response(f"POST /api/datasets/{dataset_id}/generate_xml/", response)
+    print_response(f"POST /api/datasets/{dataset_id}/generate_xml/", response, max_bytes=2048)
 
 
 def test_validate_xml(dataset_id):
     """Test POST /api/datasets/{id}/validate_xml/"""
     print(f"\n\n🔍 TEST 7: Validate XML (ID={dataset_id})")
-    response = requests.post(f"{BASE_URL}/datasets/{dataset_id}/validate_xml/")
-    print_response(f"POST /api/datasets/{dataset_id}/validate_xml/", response)
+    response = SESSION.post(f"{BASE_URL}/datasets/{dataset_id}/validate_xml/", stream=True)
+    print_response(f"POST /api/datasets/{dataset_id}/validate_xml/", response, max_bytes=2048)
 
 
 def test_list_records(dataset_id=None):
@@ -93,7 +115,7 @@ def test_list_records(dataset_id=None):
     if dataset_id:
         url += f"?dataset={dataset_id}"
     
-    response = requests.get(url)
+    response = SESSION.get(url)
     print_response(f"GET {url}", response)
 
 
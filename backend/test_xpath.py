@@ -3,96 +3,207 @@ XPath/XQuery Testing Script
 """
 
 import requests
-import json
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pprint
 
 BASE_URL = "http://127.0.0.1:8000/api"
 
+# One session for all tests, so requests reuse a kept-alive connection
+SESSION = requests.Session()
 
-def print_response(title, response):
-    """Pretty print API response"""
-    print(f"\n{'='*80}")
-    print(f"{title}")
-    print(f"{'='*80}")
+# Independent queries of a test are sent in parallel (below the session's pool size of 10)
+MAX_WORKERS = 8
+
+# (connect, read) timeouts in seconds, so a wedged server cannot hang the suite
+TIMEOUT = (3.05, 30)
+
+# Request bodies are encoded with orjson and sent with this header
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Bytes of a streamed response body read for printing; the rest is never downloaded
+PREVIEW_BYTES = 2048
+
+# Separator line of the printed output
+BANNER = '=' * 80
+
+# Queries sent by the tests, built once
+EXECUTE_QUERIES = (
+    {
+        'name': 'First 3 records',
+        'xpath': '//record[position() <= 3]',
+        'format': 'dict'
+    },
+    {
+        'name': 'All State_Name values',
+        'xpath': '//record/State_Name/text()',
+        'format': 'text'
+    },
+    {
+        'name': 'Count total records',
+        'xpath': '//record',
+        'format': 'count'
+    },
+)
+
+AGGREGATE_OPERATIONS = ('count', 'sum', 'avg', 'min', 'max')
+
+FLWOR_QUERIES = (
+    {
+        'name': 'Simple query - all records',
+        'for': '//record',
+        'where': None,
+        'return': None
+    },
+    {
+        'name': 'Query with WHERE - filter by Crop',
+        'for': '//record',
+        'where': 'Crop="Rice"',
+        'return': None
+    },
+    {
+        'name': 'Query with WHERE and RETURN',
+        'for': '//record',
+        'where': 'Crop="Rice"',
+        'return': 'State_Name'
+    },
+)
+
+ADVANCED_QUERIES = (
+    {
+        'name': 'Get distinct Crop values',
+        'title': 'Distinct: Crop',
+        # Server-side set reduction; the XPath idiom
+        # //record/Crop[not(. = preceding::Crop)] is quadratic
+        'query': {'type': 'distinct', 'field': 'Crop'}
+    },
+    {
+        'name': 'Last 5 records',
+        'title': 'XPath: //record[position() > last()-5]',
+        'query': {'xpath': '//record[position() > last()-5]', 'format': 'dict'}
+    },
+    {
+        'name': 'Records with specific Season',
+        'title': 'XPath: //record[Season="Kharif"]',
+        'query': {'xpath': '//record[Season="Kharif"]', 'format': 'count'}
+    },
+)
+
+
+def print_response(title, response, max_bytes=None):
+    """
+    Pretty print API response.
+    With max_bytes, the response must be streamed (stream=True): only that
+    many bytes are read, and the body is printed as text if it was cut off.
+    """
+    print(f"\n{BANNER}")
+    print(title)
+    print(BANNER)
     print(f"Status: {response.status_code}")
     
+    if max_bytes is not None:
+        with response:
+            body = response.raw.read(max_bytes, decode_content=True)
+        try:
+            data = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            print(body.decode(errors='replace'))
+            return
+        print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
+        return
+    
     try:
-        data = response.json()
-        print(json.dumps(data, indent=2)[:2000])
+        data = orjson.loads(response.content)
+        print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()[:2000])
     except:
         print(response.text[:500])
 
 
+def print_batch_results(headings, response):
+    """Print each result of a POST /api/xpath/batch/ response under its (name, title)"""
+    if response.status_code != 200:
+        print_response("POST /api/xpath/batch/", response)
+        return
+    
+    for (name, title), result in zip(headings, orjson.loads(response.content)['results']):
+        print(f"\n--- {name} ---")
+        print(f"\n{BANNER}")
+        print(title)
+        print(BANNER)
+        print(f"Status: {'error' if 'error' in result else 'ok'}")
+        print(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()[:2000])
+
+
+def post_json(url, payload, **kwargs):
+    """POST payload as a JSON body encoded with orjson"""
+    return SESSION.post(url, data=orjson.dumps(payload), headers=JSON_HEADERS,
+                        timeout=TIMEOUT, **kwargs)
+
+
+def post_batch(dataset_id, queries):
+    """Send several queries in one POST /api/xpath/batch/"""
+    return post_json(
+        f"{BASE_URL}/xpath/batch/",
+        {'dataset_id': dataset_id, 'queries': queries}
+    )
+
+
+def post_all(url, payloads):
+    """
+    POST every payload to url in parallel; responses are returned in payload
+    order, streamed (print them with max_bytes)
+    """
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        return list(executor.map(
+            lambda payload: post_json(url, payload, stream=True), payloads
+        ))
+
+
 def test_xpath_examples():
     """Test 1: Get XPath examples"""
     print("\n\n🔍 TEST 1: Get XPath Query Examples")
-    response = requests.get(f"{BASE_URL}/xpath/")
-    print_response("GET /api/xpath/", response)
+    response = SESSION.get(f"{BASE_URL}/xpath/", stream=True, timeout=TIMEOUT)
+    print_response("GET /api/xpath/", response, max_bytes=PREVIEW_BYTES)
 
 
 def test_xpath_execute(dataset_id=1):
     """Test 2: Execute XPath queries"""
     print(f"\n\n🔍 TEST 2: Execute XPath Queries (Dataset ID={dataset_id})")
     
-    queries = [
-        {
-            'name': 'First 3 records',
-            'xpath': '//record[position() <= 3]',
-            'format': 'dict'
-        },
-        {
-            'name': 'All State_Name values',
-            'xpath': '//record/State_Name/text()',
-            'format': 'text'
-        },
-        {
-            'name': 'Count total records',
-            'xpath': '//record',
-            'format': 'count'
-        },
-    ]
-    
-    for query in queries:
-        print(f"\n--- {query['name']} ---")
-        response = requests.post(
-            f"{BASE_URL}/xpath/execute/",
-            json={
-                'dataset_id': dataset_id,
-                'xpath': query['xpath'],
-                'format': query['format']
-            }
-        )
-        print_response(f"XPath: {query['xpath']}", response)
+    response = post_batch(dataset_id, [
+        {'xpath': query['xpath'], 'format': query['format']}
+        for query in EXECUTE_QUERIES
+    ])
+    print_batch_results(
+        [(query['name'], f"XPath: {query['xpath']}") for query in EXECUTE_QUERIES], response
+    )
 
 
 def test_xpath_statistics(dataset_id=1):
     """Test 3: Get XML statistics"""
     print(f"\n\n🔍 TEST 3: Get XML Statistics (Dataset ID={dataset_id})")
     
-    response = requests.post(
+    response = post_json(
         f"{BASE_URL}/xpath/statistics/",
-        json={'dataset_id': dataset_id}
+        {'dataset_id': dataset_id},
+        stream=True
     )
-    print_response("POST /api/xpath/statistics/", response)
+    print_response("POST /api/xpath/statistics/", response, max_bytes=PREVIEW_BYTES)
 
 
 def test_aggregate(dataset_id=1):
     """Test 4: Aggregate operations"""
     print(f"\n\n🔍 TEST 4: Aggregate Operations (Dataset ID={dataset_id})")
     
-    operations = ['count', 'sum', 'avg', 'min', 'max']
-    
-    for operation in operations:
-        print(f"\n--- {operation.upper()} of Area field ---")
-        response = requests.post(
-            f"{BASE_URL}/xpath/aggregate/",
-            json={
-                'dataset_id': dataset_id,
-                'field': 'Area',
-                'operation': operation
-            }
-        )
-        print_response(f"Aggregate: {operation}", response)
+    response = post_batch(dataset_id, [
+        {'type': 'aggregate', 'field': 'Area', 'operation': operation}
+        for operation in AGGREGATE_OPERATIONS
+    ])
+    print_batch_results(
+        [(f"{operation.upper()} of Area field", f"Aggregate: {operation}")
+         for operation in AGGREGATE_OPERATIONS],
+        response
+    )
 
 
 def test_group_by(dataset_id=1):
@@ -100,107 +211,69 @@ def test_group_by(dataset_id=1):
     print(f"\n\n🔍 TEST 5: Group By Operations (Dataset ID={dataset_id})")
     
     print("\n--- Group by Season (with Area aggregation) ---")
-    response = requests.post(
+    response = post_json(
         f"{BASE_URL}/xpath/group_by/",
-        json={
+        {
             'dataset_id': dataset_id,
             'group_field': 'Season',
             'aggregate_field': 'Area'
-        }
+        },
+        stream=True
     )
-    print_response("Group by Season", response)
+    print_response("Group by Season", response, max_bytes=PREVIEW_BYTES)
 
 
 def test_flwor_query(dataset_id=1):
     """Test 6: FLWOR-like queries"""
     print(f"\n\n🔍 TEST 6: FLWOR-like Queries (Dataset ID={dataset_id})")
     
-    queries = [
-        {
-            'name': 'Simple query - all records',
-            'for': '//record',
-            'where': None,
-            'return': None
-        },
-        {
-            'name': 'Query with WHERE - filter by Crop',
-            'for': '//record',
-            'where': 'Crop="Rice"',
-            'return': None
-        },
-        {
-            'name': 'Query with WHERE and RETURN',
-            'for': '//record',
-            'where': 'Crop="Rice"',
-            'return': 'State_Name'
-        },
-    ]
-    
-    for query in queries:
-        print(f"\n--- {query['name']} ---")
+    payloads = []
+    for query in FLWOR_QUERIES:
         data = {'dataset_id': dataset_id, 'for': query['for']}
         if query['where']:
             data['where'] = query['where']
         if query['return']:
             data['return'] = query['return']
-        
-        response = requests.post(
-            f"{BASE_URL}/xpath/query/",
-            json=data
-        )
-        print_response(f"FLWOR Query", response)
+        payloads.append(data)
+    
+    responses = post_all(f"{BASE_URL}/xpath/query/", payloads)
+    
+    for query, response in zip(FLWOR_QUERIES, responses):
+        print(f"\n--- {query['name']} ---")
+        print_response(f"FLWOR Query", response, max_bytes=PREVIEW_BYTES)
 
 
 def test_advanced_xpath(dataset_id=1):
     """Test 7: Advanced XPath queries"""
     print(f"\n\n🔍 TEST 7: Advanced XPath Queries (Dataset ID={dataset_id})")
     
-    queries = [
-        {
-            'name': 'Get distinct Crop values',
-            'xpath': '//record/Crop[not(. = preceding::Crop)]/text()',
-            'format': 'text'
-        },
-        {
-            'name': 'Last 5 records',
-            'xpath': '//record[position() > last()-5]',
-            'format': 'dict'
-        },
-        {
-            'name': 'Records with specific Season',
-            'xpath': '//record[Season="Kharif"]',
-            'format': 'count'
-        },
-    ]
-    
-    for query in queries:
-        print(f"\n--- {query['name']} ---")
-        response = requests.post(
-            f"{BASE_URL}/xpath/execute/",
-            json={
-                'dataset_id': dataset_id,
-                'xpath': query['xpath'],
-                'format': query['format']
-            }
-        )
-        print_response(f"XPath: {query['xpath']}", response)
+    response = post_batch(dataset_id, [query['query'] for query in ADVANCED_QUERIES])
+    print_batch_results([(query['name'], query['title']) for query in ADVANCED_QUERIES], response)
 
 
 def run_all_tests():
     """Run all XPath/XQuery tests"""
-    print("="*80)
+    print(BANNER)
     print("🚀 IPVC Integration System - XPath/XQuery Tests")
-    print("="*80)
+    print(BANNER)
+    
+    # Fail fast when the server is not running
+    try:
+        SESSION.head(f"{BASE_URL}/", timeout=1.0)
+    except requests.exceptions.RequestException:
+        print("❌ Could not connect to API. Make sure Django server is running:")
+        print("   python manage.py runserver")
+        return
     
     # Get datasets first
     print("\n📋 Getting available datasets...")
-    response = requests.get(f"{BASE_URL}/datasets/")
+    response = SESSION.get(f"{BASE_URL}/datasets/", timeout=TIMEOUT)
     
     if response.status_code != 200:
         print("❌ Could not connect to API. Make sure Django server is running.")
         return
     
-    datasets = response.json().get('results', [])
+    datasets = orjson.loads(response.content).get('results', [])
     
     if not datasets:
         print("❌ No datasets found. Please import CSV and generate XML first:")
@@ -208,14 +281,14 @@ def run_all_tests():
         print("   python manager.py xml agriculture -l 100")
         return
     
-    # Find a dataset with XML
+    # Find a dataset with XML: the server filters, so only its detail is fetched
     dataset = None
-    for ds in datasets:
-        response_detail = requests.get(f"{BASE_URL}/datasets/{ds['id']}/")
-        dataset_detail = response_detail.json()
-        if dataset_detail.get('xml_file_path'):
-            dataset = dataset_detail
-            break
+    response = SESSION.get(f"{BASE_URL}/datasets/", params={'has_xml': 'true'}, timeout=TIMEOUT)
+    with_xml = orjson.loads(response.content).get('results', [])
+    if with_xml:
+        dataset = orjson.loads(
+            SESSION.get(f"{BASE_URL}/datasets/{with_xml[0]['id']}/", timeout=TIMEOUT).content
+        )
     
     if not dataset:
         print("❌ No datasets with XML found. Generate XML first:")
@@ -238,9 +311,9 @@ def run_all_tests():
     test_flwor_query(dataset_id)
     test_advanced_xpath(dataset_id)
     
-    print("\n\n" + "="*80)
+    print("\n\n" + BANNER)
     print("✅ All XPath/XQuery tests completed!")
-    print("="*80)
+    print(BANNER)
     print("\n📝 XPath/XQuery API Endpoints:")
     print("   • GET    /api/xpath/                - List examples")
     print("   • POST   /api/xpath/execute/        - Execute XPath query")
@@ -248,6 +321,8 @@ def run_all_tests():
     print("   • POST   /api/xpath/aggregate/      - Aggregate operations")
     print("   • POST   /api/xpath/group_by/       - Group by field")
     print("   • POST   /api/xpath/query/          - FLWOR-like query")
+    print("   • POST   /api/xpath/distinct/       - Distinct values of a field")
+    print("   • POST   /api/xpath/batch/          - Several queries in one request")
     print("\n🌐 REST API: http://127.0.0.1:8000/api/xpath/")
     print("\n💡 Examples:")
     print("   curl -X POST http://127.0.0.1:8000/api/xpath/execute/ \\")